@@ -1,21 +1,104 @@
-from fastapi import APIRouter, Depends, File, UploadFile
+import tempfile
 
-from app.deps import get_kb_service
+from fastapi import APIRouter, Depends, File, Query, UploadFile
+
+from app.core.blocking import run_blocking
+from app.core.config import get_settings
+from app.deps import get_ingest_queue, get_kb_service
+from app.kb.jobs import IngestJobQueue
 from app.kb.service import KBService
-from app.schemas import KBQueryRequest, KBQueryResponse, KBUploadResponse
+from app.schemas import (
+    DEFAULT_NAMESPACE,
+    NAMESPACE_PATTERN,
+    KBDeleteResponse,
+    KBJobStatus,
+    KBQueryBatchRequest,
+    KBQueryBatchResponse,
+    KBQueryBatchResult,
+    KBQueryRequest,
+    KBQueryResponse,
+    KBStatsResponse,
+    KBUploadResponse,
+)
 
 router = APIRouter(prefix="/kb", tags=["knowledge-base"])
 
+NamespaceQuery = Query(default=DEFAULT_NAMESPACE, pattern=NAMESPACE_PATTERN)
+
+
+@router.post("/upload", response_model=KBUploadResponse, status_code=202)
+async def upload_doc(
+    file: UploadFile = File(...),
+    replace: bool = False,
+    namespace: str = NamespaceQuery,
+    queue: IngestJobQueue = Depends(get_ingest_queue),
+) -> KBUploadResponse:
+    """Queue a document for ingestion; `replace=true` swaps out earlier uploads with the same filename."""
+    # Starlette closes the upload when the response is sent, so the job gets its own spooled copy.
+    block_size = get_settings().kb_ingest_read_block_bytes
+    spooled = tempfile.TemporaryFile()
+    try:
+        while block := await file.read(block_size):
+            spooled.write(block)
+        spooled.seek(0)
+        job = queue.submit(file.filename, spooled, replace=replace, namespace=namespace)
+    except BaseException:
+        spooled.close()
+        raise
+    return KBUploadResponse(job_id=job.job_id, doc_id=job.doc_id, status=job.status)
+
+
+@router.delete("/docs/{doc_id}", response_model=KBDeleteResponse)
+async def delete_doc(
+    doc_id: str, namespace: str = NamespaceQuery, kb_service: KBService = Depends(get_kb_service)
+) -> KBDeleteResponse:
+    deleted = await run_blocking(kb_service.delete_document, doc_id, namespace=namespace)
+    return KBDeleteResponse(doc_id=doc_id, chunks_deleted=deleted)
 
-@router.post("/upload", response_model=KBUploadResponse)
-async def upload_doc(file: UploadFile = File(...), kb_service: KBService = Depends(get_kb_service)) -> KBUploadResponse:
-    data = await file.read()
-    doc_id, chunks = kb_service.upload_document(file.filename, data)
-    return KBUploadResponse(doc_id=doc_id, chunks=chunks)
+
+@router.get("/stats", response_model=KBStatsResponse)
+async def kb_stats(namespace: str = NamespaceQuery, kb_service: KBService = Depends(get_kb_service)) -> KBStatsResponse:
+    return KBStatsResponse(**await run_blocking(kb_service.stats, namespace))
+
+
+@router.get("/jobs/{job_id}", response_model=KBJobStatus)
+async def get_job(job_id: str, queue: IngestJobQueue = Depends(get_ingest_queue)) -> KBJobStatus:
+    job = queue.get(job_id)
+    return KBJobStatus(
+        job_id=job.job_id,
+        filename=job.filename,
+        doc_id=job.doc_id,
+        namespace=job.namespace,
+        status=job.status,
+        chunks_embedded=job.chunks_embedded,
+        chunks_indexed=job.chunks_indexed,
+        chunks_per_s=job.chunks_per_s,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
 
 
 @router.post("/query", response_model=KBQueryResponse)
 async def query_kb(req: KBQueryRequest, kb_service: KBService = Depends(get_kb_service)) -> KBQueryResponse:
-    matches = kb_service.query(req.query, req.top_k)
+    matches = await run_blocking(
+        kb_service.query,
+        req.query,
+        req.top_k,
+        nprobe=req.nprobe,
+        ef_search=req.ef_search,
+        mode=req.mode,
+        namespace=req.namespace,
+    )
     return KBQueryResponse(matches=matches)
 
+
+@router.post("/query_batch", response_model=KBQueryBatchResponse)
+async def query_kb_batch(req: KBQueryBatchRequest, kb_service: KBService = Depends(get_kb_service)) -> KBQueryBatchResponse:
+    results = await run_blocking(
+        kb_service.query_batch, req.queries, req.top_k, nprobe=req.nprobe, ef_search=req.ef_search, namespace=req.namespace
+    )
+    return KBQueryBatchResponse(
+        results=[KBQueryBatchResult(query=query, matches=matches) for query, matches in zip(req.queries, results)]
+    )
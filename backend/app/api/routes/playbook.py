@@ -9,5 +9,5 @@ router = APIRouter(prefix="/playbook", tags=["playbook"])
 
 @router.post("/run")
 async def run_playbook(req: PlaybookRequest, agent: AgentAutomationProvider = Depends(get_agent_provider)) -> dict:
-    return agent.run_playbook(req.name, req.payload)
+    return await agent.arun_playbook(req.name, req.payload)
 
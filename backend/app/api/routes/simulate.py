@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends
 
+from app.core.config import get_settings
+from app.core.deadline import Deadline
 from app.deps import get_sim_service
 from app.schemas import DecisionSpec, DecisionSpecRequest, SimulateRequest, SimulationResult
 from app.sim.service import SimulationService
@@ -13,9 +15,9 @@ async def decision_spec(
     sim_service: SimulationService = Depends(get_sim_service),
 ) -> DecisionSpec:
     source_text = req.decision_text or req.transcript or ""
-    return sim_service.extract_decision_spec(source_text)
+    return await sim_service.aextract_decision_spec(source_text, Deadline(get_settings().request_deadline_s))
 
 
 @router.post("/simulate", response_model=SimulationResult)
 async def simulate(req: SimulateRequest, sim_service: SimulationService = Depends(get_sim_service)) -> SimulationResult:
-    return sim_service.run(req)
+    return await sim_service.arun(req, Deadline(get_settings().request_deadline_s))
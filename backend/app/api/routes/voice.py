@@ -12,7 +12,7 @@ router = APIRouter(prefix="/voice", tags=["voice"])
 
 @router.post("/session", response_model=VoiceSessionResponse)
 async def create_voice_session(voice_service: VoiceService = Depends(get_voice_service)) -> VoiceSessionResponse:
-    return VoiceSessionResponse(session_id=voice_service.create_session())
+    return VoiceSessionResponse(session_id=await voice_service.acreate_session())
 
 
 @router.websocket("/stream/{session_id}")
@@ -24,7 +24,7 @@ async def voice_stream(websocket: WebSocket, session_id: str, voice_service: Voi
             payload = json.loads(msg)
             audio_b64 = payload.get("audio_base64", "")
             audio_bytes = base64.b64decode(audio_b64) if audio_b64 else b""
-            out = voice_service.process_chunk(session_id, audio_bytes)
+            out = await voice_service.aprocess_chunk(session_id, audio_bytes)
             await websocket.send_text(json.dumps(out))
     except WebSocketDisconnect:
         return
@@ -0,0 +1,35 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from app.core.config import get_settings
+
+T = TypeVar("T")
+
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def blocking_pool() -> ThreadPoolExecutor:
+    """The process-wide pool for provider and SQLite calls, sized by `blocking_pool_workers`.
+
+    Kept apart from the default executor so a burst of slow Bedrock calls cannot starve
+    other users of `run_in_executor`, and vice versa.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=get_settings().blocking_pool_workers, thread_name_prefix="blocking")
+        return _pool
+
+
+async def run_blocking(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run a synchronous call on the blocking pool without stalling the event loop.
+
+    The caller's context variables (the request id used in logs) carry over into the thread.
+    """
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(blocking_pool(), call)
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Small thread-safe LRU map with optional per-entry TTL; a max_size of 0 disables caching."""
+
+    def __init__(self, max_size: int, ttl_s: float | None = None):
+        self._max_size = max_size
+        self._ttl_s = ttl_s
+        self._data: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: K, value: V) -> None:
+        if self._max_size <= 0:
+            return
+        expires = time.monotonic() + self._ttl_s if self._ttl_s else float("inf")
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: K) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class SingleFlight(Generic[K, V]):
+    """Collapses concurrent calls for the same key into one; the others wait for and share its result."""
+
+    def __init__(self) -> None:
+        self._calls: dict[K, Future] = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key: K, fn: Callable[[], V]) -> V:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return call.result()
+        try:
+            call.set_result(fn())
+        except BaseException as exc:
+            call.set_exception(exc)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result()
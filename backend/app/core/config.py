@@ -1,5 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -10,17 +11,86 @@ class Settings(BaseSettings):
     use_mock_providers: bool = True
     log_level: str = "INFO"
     cors_origins: str = "http://localhost:3000,http://127.0.0.1:3000"
+    blocking_pool_workers: int = 32
+    request_deadline_s: float = 45.0
 
     aws_region: str = "us-east-1"
     aws_profile: str | None = None
+    bedrock_endpoint_url: str | None = None
+    bedrock_max_pool_connections: int = 50
+    bedrock_connect_timeout_s: float = 5.0
+    bedrock_read_timeout_s: float = 60.0
+    bedrock_tcp_keepalive: bool = True
+    bedrock_warmup: bool = False
+    bedrock_warmup_connections: int = 4
     bedrock_model_id_nova_lite: str = "amazon.nova-lite-v1:0"
+    nova_lite_max_attempts: int = 3
+    nova_lite_backoff_base_s: float = 1.0
+    nova_lite_backoff_max_s: float = 8.0
+    nova_lite_hedge_enabled: bool = False
+    nova_lite_hedge_percentile: float = 95.0
+    nova_lite_hedge_max_rate: float = 0.05
+    nova_lite_hedge_min_samples: int = 20
+    nova_lite_hedge_window: int = 500
     nova_embeddings_model_id: str = "amazon.nova-multimodal-embeddings-v1:0"
     nova_sonic_model_id: str = "amazon.nova-2-sonic-v1:0"
+    nova_embeddings_concurrency: int = 8
+    nova_embeddings_rps: float = 20.0
+    nova_embeddings_burst: int = 20
+    nova_embeddings_max_attempts: int = 6
+    nova_embeddings_backoff_base_s: float = 0.25
+    nova_embeddings_backoff_max_s: float = 8.0
 
     kb_db_path: str = "data/kb.sqlite3"
     kb_index_path: str = "data/kb.faiss"
+    kb_namespace_dir: str = "data/namespaces"
+    kb_shard_memory_budget_mb: float = 1024.0
+    kb_shard_fanout_workers: int = 4
     kb_chunk_size: int = 800
     kb_chunk_overlap: int = 120
+    kb_ingest_batch_size: int = 64
+    kb_ingest_read_block_bytes: int = 65_536
+    kb_ingest_workers: int = 2
+    kb_ingest_queue_size: int = 32
+    kb_ingest_job_history: int = 1000
+    kb_bulk_ingest_processes: int = 0
+    kb_bulk_embed_concurrency: int = 4
+    kb_context_top_k: int = 6
+    kb_index_compact_records: int = 5000
+    kb_index_compact_interval_s: float = 60.0
+    kb_index_mmap: bool = True
+    kb_index_delta_merge_ratio: float = 0.1
+    kb_tombstone_compact_ratio: float = 0.2
+    kb_chunk_cache_size: int = 2048
+    kb_sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    kb_sqlite_mmap_size: int = 268_435_456
+    kb_sqlite_cache_size_kb: int = 65_536
+    kb_sqlite_busy_timeout_ms: int = 5000
+    kb_sqlite_statement_cache: int = 256
+    kb_index_type: Literal["flat", "ivf_flat", "ivf_pq", "hnsw"] = "flat"
+    kb_ann_promote_threshold: int = 50_000
+    kb_ann_train_sample: int = 50_000
+    kb_ann_recall_queries: int = 200
+    kb_ann_min_recall: float = 0.9
+    kb_ivf_nlist: int = 0
+    kb_pq_m: int = 16
+    kb_hnsw_m: int = 32
+    kb_hnsw_ef_construction: int = 200
+    kb_nprobe: int = 16
+    kb_ef_search: int = 64
+    kb_vector_storage: Literal["float32", "float16", "int8"] = "float32"
+    kb_rerank_factor: int = 4
+    kb_hybrid_candidates: int = 50
+    kb_hybrid_budget_ms: float = 25.0
+    kb_hybrid_workers: int = 4
+    kb_rrf_k: int = 60
+    kb_query_cache_size: int = 1024
+    kb_query_cache_ttl_s: float = 900.0
+    kb_result_cache_size: int = 256
+    kb_embedding_cache_enabled: bool = True
+    kb_embedding_cache_path: str = "data/kb_embeddings.sqlite3"
+    kb_embedding_cache_max_entries: int = 500_000
+    kb_embedding_cache_max_age_days: float = 180.0
 
     model_config = SettingsConfigDict(
         env_file=".env",
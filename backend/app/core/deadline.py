@@ -0,0 +1,72 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from app.core.errors import AppError
+
+
+class DeadlineExceeded(AppError):
+    def __init__(self, message: str = "The request ran out of time waiting on the model provider."):
+        super().__init__(code="deadline_exceeded", message=message, status_code=504)
+
+
+class Deadline:
+    """A request's time budget, plus a tally of the provider attempts made against it.
+
+    Thread-safe: embedding calls record attempts from pool threads.
+    """
+
+    def __init__(self, timeout_s: float | None = None):
+        self.started = time.monotonic()
+        self.timeout_s = timeout_s
+        self._expires_at = self.started + timeout_s if timeout_s is not None else math.inf
+        self._lock = threading.Lock()
+        self.attempts = 0
+        self.retries = 0
+        self.retry_wait_s = 0.0
+        self.skipped = 0
+        self.hedges = 0
+
+    def remaining(self) -> float:
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def elapsed_ms(self) -> int:
+        return int((time.monotonic() - self.started) * 1000)
+
+    def record_attempt(self) -> None:
+        with self._lock:
+            self.attempts += 1
+
+    def record_retry(self, wait_s: float) -> None:
+        with self._lock:
+            self.retries += 1
+            self.retry_wait_s += wait_s
+
+    def record_skip(self) -> None:
+        with self._lock:
+            self.skipped += 1
+
+    def record_hedge(self) -> None:
+        with self._lock:
+            self.hedges += 1
+
+
+_current: ContextVar[Deadline | None] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Deadline:
+    """The deadline of the request being served; unbounded outside one (ingest jobs, the CLI)."""
+    return _current.get() or Deadline()
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline) -> Iterator[Deadline]:
+    """Make `deadline` the current one for provider calls made inside the block, including via `run_blocking`."""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
@@ -0,0 +1,145 @@
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, TypeVar
+
+import numpy as np
+
+from app.core.deadline import current_deadline
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LatencyWindow:
+    """Latencies of the last `size` calls to one model, for an online percentile."""
+
+    def __init__(self, size: int):
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, latency_s: float) -> None:
+        with self._lock:
+            self._samples.append(latency_s)
+
+    def percentile(self, q: float, min_samples: int) -> float | None:
+        """The `q`th percentile in seconds, or None until `min_samples` calls have been seen."""
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            samples = np.fromiter(self._samples, dtype=np.float64)
+        return float(np.percentile(samples, q))
+
+
+_windows: dict[str, LatencyWindow] = {}
+_windows_lock = threading.Lock()
+
+
+def latency_window(model_id: str, size: int) -> LatencyWindow:
+    """The process-wide window for `model_id`, so every client of a model learns from the same calls."""
+    with _windows_lock:
+        window = _windows.get(model_id)
+        if window is None:
+            window = _windows[model_id] = LatencyWindow(size)
+        return window
+
+
+class HedgeBudget:
+    """Caps hedges at `max_rate` of calls: each call earns `max_rate` of a hedge, each hedge spends one.
+
+    Unspent credit is capped so a quiet spell cannot bank a burst of hedges.
+    """
+
+    def __init__(self, max_rate: float, max_credit: float = 10.0):
+        self._rate = max(0.0, max_rate)
+        self._max_credit = max(1.0, max_credit)
+        self._credit = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self._credit = min(self._max_credit, self._credit + self._rate)
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self._credit < 1.0:
+                return False
+            self._credit -= 1.0
+            return True
+
+
+class Hedger:
+    """Sends a second identical request when the first is slower than the model's usual `percentile`.
+
+    Whichever attempt finishes first with a result wins. The other is ignored, since a
+    boto3 call cannot be cancelled once sent, but still feeds the latency window when it
+    completes. Until the window has `min_samples` calls, or while the budget is spent,
+    calls run unhedged.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        percentile: float,
+        max_rate: float,
+        min_samples: int,
+        window: int,
+        max_workers: int,
+    ):
+        self.model_id = model_id
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self._window = latency_window(model_id, window)
+        self._budget = HedgeBudget(max_rate)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+
+    def call(self, fn: Callable[[], T]) -> T:
+        with self._lock:
+            self.calls += 1
+        self._budget.earn()
+        delay = self._window.percentile(self.percentile, self.min_samples)
+        if delay is None:
+            return self._timed(fn)
+
+        primary = self._submit(fn)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._budget.spend():
+            return primary.result()
+
+        with self._lock:
+            self.hedges += 1
+        current_deadline().record_hedge()
+        logger.info("llm_request_hedged", extra={"model_id": self.model_id, "after_ms": int(delay * 1000)})
+        hedge = self._submit(fn)
+        return self._first_result([primary, hedge])
+
+    def _submit(self, fn: Callable[[], T]) -> Future:
+        # Each attempt gets its own copy of the caller's context (request id, deadline).
+        return self._pool.submit(contextvars.copy_context().run, self._timed, fn)
+
+    def _timed(self, fn: Callable[[], T]) -> T:
+        # Only successes are recorded: fast failures would drag the percentile down.
+        started = time.monotonic()
+        result = fn()
+        self._window.record(time.monotonic() - started)
+        return result
+
+    @staticmethod
+    def _first_result(futures: list[Future]) -> T:
+        pending = set(futures)
+        first_error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                first_error = first_error or future.exception()
+        assert first_error is not None
+        raise first_error
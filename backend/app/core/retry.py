@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Callable, TypeVar
+
+from botocore.exceptions import ClientError, ConnectionError, ReadTimeoutError
+
+from app.core.blocking import run_blocking
+from app.core.deadline import Deadline, DeadlineExceeded, current_deadline
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TRANSIENT_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "InternalServerException",
+    "ModelTimeoutException",
+}
+
+
+def is_transient(exc: Exception) -> bool:
+    """Throttling, 5xx-style Bedrock errors and dropped or timed-out connections; anything else fails fast."""
+    if isinstance(exc, ClientError):
+        return exc.response.get("Error", {}).get("Code", "") in TRANSIENT_CODES
+    return isinstance(exc, (ConnectionError, ReadTimeoutError))
+
+
+class RetryPolicy:
+    """The one place that decides whether a provider call gets another attempt.
+
+    `fn(attempt)` is called with the 1-based attempt number. Waits use full jitter so
+    callers throttled together do not retry together. The first attempt always runs;
+    before each retry the policy checks the current `Deadline`: if what is left cannot
+    cover the backoff plus the expected latency of a call (a moving average of past
+    completed attempts), it stops with `DeadlineExceeded` instead of starting an attempt
+    that cannot finish in time.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_attempts: int,
+        backoff_base_s: float,
+        backoff_max_s: float,
+        retryable: Callable[[Exception], bool] = is_transient,
+    ):
+        self.name = name
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.retryable = retryable
+        self._expected_s = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def expected_latency_s(self) -> float:
+        return self._expected_s
+
+    def call(self, fn: Callable[[int], T], deadline: Deadline | None = None) -> T:
+        deadline = deadline or current_deadline()
+        wait_s = 0.0
+        for attempt in range(1, self.max_attempts + 1):
+            self._admit(deadline, attempt, wait_s)
+            time.sleep(wait_s)
+            started = time.monotonic()
+            try:
+                result = fn(attempt)
+            except Exception as exc:
+                self._observe(deadline, started)
+                wait_s = self._next_wait(exc, attempt)
+                continue
+            self._observe(deadline, started)
+            return result
+        raise AssertionError("unreachable")
+
+    async def acall(self, fn: Callable[[int], T]) -> T:
+        """`call` for the event loop: attempts run on the blocking pool and backoff waits on the loop.
+
+        An attempt still running when the deadline passes is abandoned (its thread finishes
+        in the background) so the request can answer on time.
+        """
+        deadline = current_deadline()
+        wait_s = 0.0
+        for attempt in range(1, self.max_attempts + 1):
+            self._admit(deadline, attempt, wait_s)
+            await asyncio.sleep(wait_s)
+            started = time.monotonic()
+            timeout = deadline.remaining() if deadline.timeout_s is not None else None
+            try:
+                result = await asyncio.wait_for(run_blocking(fn, attempt), timeout)
+            except asyncio.TimeoutError:
+                # Only the deadline ended this attempt, so its duration says nothing about the
+                # provider's latency and stays out of the average.
+                deadline.record_attempt()
+                raise DeadlineExceeded() from None
+            except Exception as exc:
+                self._observe(deadline, started)
+                wait_s = self._next_wait(exc, attempt)
+                continue
+            self._observe(deadline, started)
+            return result
+        raise AssertionError("unreachable")
+
+    def _admit(self, deadline: Deadline, attempt: int, wait_s: float) -> None:
+        if attempt == 1:
+            return
+        needed = wait_s + self._expected_s
+        remaining = deadline.remaining()
+        if remaining > needed:
+            deadline.record_retry(wait_s)
+            return
+        deadline.record_skip()
+        logger.warning(
+            "retry_skipped_for_deadline",
+            extra={"policy": self.name, "attempt": attempt, "remaining_s": round(remaining, 3), "needed_s": round(needed, 3)},
+        )
+        raise DeadlineExceeded()
+
+    def _next_wait(self, exc: Exception, attempt: int) -> float:
+        """Backoff before the next attempt; re-raises `exc` when it should not be retried."""
+        if not self.retryable(exc) or attempt >= self.max_attempts:
+            raise exc
+        wait_s = random.uniform(0.0, min(self.backoff_max_s, self.backoff_base_s * 2 ** (attempt - 1)))
+        logger.info("provider_retry", extra={"policy": self.name, "attempt": attempt, "error": type(exc).__name__, "wait_s": wait_s})
+        return wait_s
+
+    def _observe(self, deadline: Deadline, started: float) -> None:
+        elapsed = time.monotonic() - started
+        deadline.record_attempt()
+        with self._lock:
+            # EWMA: recent attempts dominate, one outlier does not.
+            self._expected_s = elapsed if self._expected_s == 0.0 else 0.8 * self._expected_s + 0.2 * elapsed
@@ -1,6 +1,7 @@
 from functools import lru_cache
 
 from app.core.config import get_settings
+from app.kb.jobs import IngestJobQueue
 from app.kb.service import KBService
 from app.providers.bedrock_nova_lite import NovaLiteClient
 from app.providers.interfaces import AgentAutomationProvider, EmbeddingProvider, LLMProvider, SpeechProvider
@@ -41,6 +42,11 @@ def get_kb_service() -> KBService:
     return KBService(get_embedding_provider())
 
 
+@lru_cache
+def get_ingest_queue() -> IngestJobQueue:
+    return IngestJobQueue(get_kb_service(), get_settings())
+
+
 @lru_cache
 def get_sim_service() -> SimulationService:
     return SimulationService(get_llm_provider(), get_kb_service())
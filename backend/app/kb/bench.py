@@ -0,0 +1,125 @@
+"""Memory and recall of the KB vector storage modes against the exact float32 flat index.
+
+    python -m app.kb.bench --vectors 200000 --dim 1024
+
+Vectors are synthetic clustered embeddings and queries are noisy copies of stored
+vectors. Memory is the serialized index size (codes plus chunk ids) scaled to one
+million chunks; recall@k is measured both on the raw quantized ranking and after
+the exact float32 rerank that KBStore applies.
+"""
+
+import argparse
+import time
+from typing import Any
+
+import numpy as np
+
+from app.core.config import Settings
+from app.kb.index_factory import exact_search, new_index, recall_at_k, training_size
+from app.kb.matrix import VectorMatrix, normalize_rows
+
+try:
+    import faiss  # type: ignore
+except Exception:  # pragma: no cover
+    faiss = None
+
+STORAGES = ("float32", "float16", "int8")
+
+
+def synthetic_embeddings(n: int, dim: int, rng: np.random.Generator, clusters: int = 64) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return normalize_rows(centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32))
+
+
+def run_benchmark(
+    n_vectors: int = 100_000,
+    dim: int = 1024,
+    n_queries: int = 200,
+    k: int = 10,
+    rerank_factor: int = 4,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    base = synthetic_embeddings(n_vectors, dim, rng)
+    ids = np.arange(1, n_vectors + 1, dtype=np.int64)
+    picks = rng.choice(n_vectors, size=n_queries, replace=False)
+    queries = normalize_rows(base[picks] + 0.05 * rng.standard_normal((n_queries, dim)).astype(np.float32))
+    exact = exact_search([(ids, base)], queries, k)
+
+    results = []
+    for storage in STORAGES:
+        settings = Settings(kb_vector_storage=storage)
+        backends = [("numpy", _NumpyRunner(ids, base, storage))]
+        if faiss:
+            backends.insert(0, ("faiss", _FaissRunner(ids, base, settings)))
+        for backend, runner in backends:
+            _, raw = runner.search(queries, k)
+            started = time.perf_counter()
+            _, candidates = runner.search(queries, k * rerank_factor)
+            reranked = _rerank(base, queries, candidates, k)
+            query_ms = (time.perf_counter() - started) * 1000 / n_queries
+            results.append(
+                {
+                    "backend": backend,
+                    "storage": storage,
+                    "bytes_per_vector": runner.nbytes / n_vectors,
+                    "mb_per_million": runner.nbytes / n_vectors * 1_000_000 / 2**20,
+                    f"recall@{k}": recall_at_k(raw, exact),
+                    f"recall@{k}_reranked": recall_at_k(reranked, exact),
+                    "query_ms": query_ms,
+                }
+            )
+    return results
+
+
+class _FaissRunner:
+    def __init__(self, ids: np.ndarray, base: np.ndarray, settings: Settings):
+        self._index = new_index("flat", base.shape[1], settings)
+        sample_size = training_size("flat", settings, len(base))
+        if sample_size:
+            self._index.train(base[:sample_size])
+        self._index.add_with_ids(base, ids)
+        self.nbytes = len(faiss.serialize_index(self._index))
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        return self._index.search(queries, k)
+
+
+class _NumpyRunner:
+    def __init__(self, ids: np.ndarray, base: np.ndarray, storage: str):
+        self._matrix = VectorMatrix(base.shape[1], storage)
+        self._matrix.append(ids, base)
+        self.nbytes = self._matrix.nbytes + ids.nbytes
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        return self._matrix.search_batch(queries, k)
+
+
+def _rerank(base: np.ndarray, queries: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    # Chunk ids start at 1, so row = id - 1; this stands in for KBStore's SQLite lookup.
+    out = np.full((len(queries), k), -1, dtype=np.int64)
+    for row, (query, cand) in enumerate(zip(queries, candidates)):
+        cand = cand[cand >= 0]
+        scores = base[cand - 1] @ query
+        out[row, : min(k, len(cand))] = cand[np.argsort(-scores, kind="stable")[:k]]
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    args = parser.parse_args()
+    rows = run_benchmark(args.vectors, args.dim, args.queries, args.k, args.rerank_factor)
+    header = list(rows[0])
+    print("  ".join(f"{h:>20}" for h in header))
+    for row in rows:
+        print("  ".join(f"{v:>20.4f}" if isinstance(v, float) else f"{v:>20}" for v in row.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Query latency of hybrid (BM25 + vector) search against vector-only search.
+
+    python -m app.kb.bench_hybrid --chunks 3000 --queries 200
+
+Chunks are random sentences over a small finance vocabulary, embedded with the mock
+embedder, in a throwaway KB. Result caching is off so every query does the full
+work; hybrid p50 should stay within `KB_HYBRID_BUDGET_MS` of the vector p50.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.core.config import Settings
+from app.kb.service import KBService
+from app.providers.mock_providers import MockEmbeddingProvider
+from app.schemas import DEFAULT_NAMESPACE
+
+WORDS = np.array(["revenue", "margin", "churn", "covenant", "ticker", "merger", "recession", "hiring", "capex", "debt"])
+
+
+def run_benchmark(n_chunks: int = 3000, n_queries: int = 200, budget_ms: float = 25.0, seed: int = 3) -> list[dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    texts = [" ".join(rng.choice(WORDS, size=40)) + f" doc{i}" for i in range(n_chunks)]
+    embedder = MockEmbeddingProvider()
+    with tempfile.TemporaryDirectory() as root:
+        settings = Settings(
+            kb_db_path=str(Path(root) / "kb.sqlite3"),
+            kb_index_path=str(Path(root) / "kb.faiss"),
+            kb_embedding_cache_enabled=False,
+            kb_hybrid_budget_ms=budget_ms,
+            kb_query_cache_size=0,
+            kb_result_cache_size=0,
+        )
+        service = KBService(embedder, settings)
+        with service._shards.lease(DEFAULT_NAMESPACE, create=True) as store:
+            store.add_chunks("bench.txt", texts, embedder.embed_texts(texts))
+        _latencies(service, "hybrid", min(n_queries, 20))  # warm the keyword workers and statement caches
+        rows = []
+        for mode in ("vector", "hybrid"):
+            samples = _latencies(service, mode, n_queries)
+            rows.append({"mode": mode, "p50_ms": float(np.percentile(samples, 50)), "p99_ms": float(np.percentile(samples, 99))})
+        service._shards.close()
+    return rows
+
+
+def _latencies(service: KBService, mode: str, n_queries: int) -> np.ndarray:
+    samples = np.empty(n_queries)
+    for i in range(n_queries):
+        started = time.perf_counter()
+        service.query(f"covenant merger doc{i}", top_k=5, mode=mode)
+        samples[i] = (time.perf_counter() - started) * 1000
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--budget-ms", type=float, default=25.0)
+    args = parser.parse_args()
+    rows = run_benchmark(args.chunks, args.queries, args.budget_ms)
+    header = list(rows[0])
+    print("  ".join(f"{h:>12}" for h in header))
+    for row in rows:
+        print("  ".join(f"{v:>12.3f}" if isinstance(v, float) else f"{v:>12}" for v in row.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,55 @@
+import codecs
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+
 def chunk_text(text: str, chunk_size: int = 800, overlap: int = 120) -> list[str]:
-    normalized = " ".join(text.split())
-    if not normalized:
-        return []
-    chunks: list[str] = []
+    return list(iter_chunks([text], chunk_size=chunk_size, overlap=overlap))
+
+
+def iter_chunks(pieces: Iterable[str], chunk_size: int = 800, overlap: int = 120) -> Iterator[str]:
+    """Stream the chunks `chunk_text` would produce for the concatenation of `pieces`.
+
+    Whitespace is collapsed across piece boundaries and only the unfinished tail
+    (at most one chunk plus the overlap) is kept between pieces.
+    """
+    buffer = ""
     start = 0
-    while start < len(normalized):
-        end = min(len(normalized), start + chunk_size)
-        chunks.append(normalized[start:end])
-        if end == len(normalized):
-            break
-        start = max(0, end - overlap)
-    return chunks
+    started = False
+    pending_space = False
+    for piece in pieces:
+        words = piece.split()
+        if not words:
+            pending_space = pending_space or bool(piece)
+            continue
+        if started and (pending_space or piece[0].isspace()):
+            buffer += " "
+        buffer += " ".join(words)
+        started = True
+        pending_space = piece[-1].isspace()
+        # A chunk is only final once text exists past its end; otherwise it may be the last one.
+        while len(buffer) - start > chunk_size:
+            end = start + chunk_size
+            yield buffer[start:end]
+            start = max(0, end - overlap)
+        buffer = buffer[start:]
+        start = 0
+    if buffer:
+        yield buffer
+
+
+def iter_document_text(filename: str, stream: BinaryIO, read_block_bytes: int = 65_536) -> Iterator[str]:
+    """Stream a document's text: PDFs page by page, anything else as UTF-8 in fixed-size blocks."""
+    if Path(filename).suffix.lower() == ".pdf":
+        from pypdf import PdfReader
 
+        # pypdf needs a seekable stream; pages are parsed one at a time as they are iterated.
+        for i, page in enumerate(PdfReader(stream).pages):
+            if i:
+                yield "\n"
+            yield page.extract_text() or ""
+        return
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    while block := stream.read(read_block_bytes):
+        yield decoder.decode(block)
+    yield decoder.decode(b"", final=True)
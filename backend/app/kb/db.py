@@ -0,0 +1,68 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.core.config import Settings
+
+
+class SQLitePool:
+    """Long-lived SQLite connections: one per reader thread plus a single serialized writer.
+
+    The database runs in WAL mode so readers never block on the writer, and every
+    connection keeps its own prepared-statement cache for the process lifetime.
+    """
+
+    def __init__(self, path: str, settings: Settings):
+        self._path = path
+        self._synchronous = settings.kb_sqlite_synchronous
+        self._mmap_size = settings.kb_sqlite_mmap_size
+        self._cache_size_kb = settings.kb_sqlite_cache_size_kb
+        self._busy_timeout_ms = settings.kb_sqlite_busy_timeout_ms
+        self._statement_cache = settings.kb_sqlite_statement_cache
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._registry_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode=WAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._path,
+            timeout=self._busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self._statement_cache,
+        )
+        conn.execute(f"PRAGMA synchronous={self._synchronous}")
+        conn.execute(f"PRAGMA mmap_size={int(self._mmap_size)}")
+        conn.execute(f"PRAGMA cache_size={-int(self._cache_size_kb)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        with self._registry_lock:
+            self._connections.append(conn)
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Serialize writes through the single writer connection; commits on success."""
+        with self._write_lock:
+            try:
+                yield self._writer
+                self._writer.commit()
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+    def close(self) -> None:
+        with self._registry_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
@@ -0,0 +1,137 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+from app.core.config import Settings
+from app.kb.db import SQLitePool
+from app.kb.vectors import pack_vector, unpack_vector
+from app.providers.interfaces import EmbeddingProvider
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> bytes:
+    """sha256 of the text after NFC and whitespace normalization, so cosmetic re-flows still hit."""
+    normalized = unicodedata.normalize("NFC", " ".join(text.split()))
+    return hashlib.sha256(normalized.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """Persistent (model id, text hash) -> embedding store kept in its own SQLite file.
+
+    Entries older than `max_age_s` are dropped, and once the cache holds more than
+    `max_entries` the least recently used rows go first.
+    """
+
+    def __init__(self, path: str, settings: Settings):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = SQLitePool(path, settings)
+        self._max_entries = settings.kb_embedding_cache_max_entries
+        self._max_age_s = settings.kb_embedding_cache_max_age_days * 86400
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        with self._db.writer() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    model_id TEXT NOT NULL,
+                    text_hash BLOB NOT NULL,
+                    embedding BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    PRIMARY KEY (model_id, text_hash)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used ON embedding_cache(last_used_at)")
+        self._entries = self._db.reader().execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+
+    def get_many(self, model_id: str, hashes: list[bytes]) -> dict[bytes, list[float]]:
+        if not hashes:
+            return {}
+        unique = list(dict.fromkeys(hashes))
+        placeholders = ",".join("?" for _ in unique)
+        rows = self._db.reader().execute(
+            f"SELECT text_hash, embedding FROM embedding_cache WHERE model_id = ? AND created_at >= ? "
+            f"AND text_hash IN ({placeholders})",
+            (model_id, time.time() - self._max_age_s, *unique),
+        ).fetchall()
+        found = {bytes(h): unpack_vector(blob).tolist() for h, blob in rows}
+        if found:
+            with self._db.writer() as conn:
+                conn.execute(
+                    f"UPDATE embedding_cache SET last_used_at = ? WHERE model_id = ? "
+                    f"AND text_hash IN ({','.join('?' for _ in found)})",
+                    (time.time(), model_id, *found),
+                )
+        with self._stats_lock:
+            self.hits += sum(1 for h in hashes if h in found)
+            self.misses += sum(1 for h in hashes if h not in found)
+        return found
+
+    def put_many(self, model_id: str, items: dict[bytes, list[float]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._db.writer() as conn:
+            # Evict first so expired rows are gone and the insert below only adds rows.
+            self._evict(conn, now, incoming=len(items))
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (model_id, text_hash, embedding, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(model_id, h, pack_vector(emb), now, now) for h, emb in items.items()],
+            )
+            self._entries += conn.total_changes - before
+
+    def _evict(self, conn: sqlite3.Connection, now: float, incoming: int) -> None:
+        expired = conn.execute("DELETE FROM embedding_cache WHERE created_at < ?", (now - self._max_age_s,)).rowcount
+        overflow = self._entries - expired + incoming - self._max_entries
+        evicted = 0
+        if overflow > 0:
+            evicted = conn.execute(
+                "DELETE FROM embedding_cache WHERE (model_id, text_hash) IN "
+                "(SELECT model_id, text_hash FROM embedding_cache ORDER BY last_used_at LIMIT ?)",
+                (overflow,),
+            ).rowcount
+        if expired or evicted:
+            self._entries -= expired + evicted
+            logger.info("kb_embedding_cache_evicted", extra={"expired": expired, "evicted": evicted})
+
+    def stats(self) -> dict[str, int]:
+        with self._stats_lock:
+            return {"entries": self._entries, "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class CachedEmbeddingProvider(EmbeddingProvider):
+    """Serves chunk embeddings from an `EmbeddingCache`, calling the wrapped provider only for unseen text."""
+
+    def __init__(self, provider: EmbeddingProvider, cache: EmbeddingCache):
+        self._provider = provider
+        self._cache = cache
+        self.model_id = provider.model_id
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        hashes = [text_hash(t) for t in texts]
+        found = self._cache.get_many(self.model_id, hashes)
+        # Boilerplate repeated within one upload is embedded once.
+        pending = {h: t for h, t in zip(hashes, texts) if h not in found}
+        if pending:
+            fresh = dict(zip(pending, self._provider.embed_texts(list(pending.values()))))
+            self._cache.put_many(self.model_id, fresh)
+            found.update(fresh)
+        return [found[h] for h in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._provider.embed_query(text)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return self._provider.embed_queries(texts)
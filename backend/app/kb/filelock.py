@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+from typing import IO
+
+if os.name == "nt":  # pragma: no cover
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    """Re-entrant exclusive lock shared by every process that opens the same lock file.
+
+    Uses `flock` on POSIX and `msvcrt.locking` on Windows; the OS drops the lock if the
+    holder dies, so a crashed worker can never wedge the others.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._local = threading.RLock()
+        self._depth = 0
+        self._fh: IO[bytes] | None = None
+
+    def __enter__(self) -> "FileLock":
+        self._local.acquire()
+        if self._depth == 0:
+            try:
+                self._fh = open(self._path, "a+b")
+                _lock(self._fh)
+            except BaseException:
+                if self._fh is not None:
+                    self._fh.close()
+                self._local.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            _unlock(self._fh)
+            self._fh.close()
+            self._fh = None
+        self._local.release()
+
+
+def _lock(fh: IO[bytes]) -> None:
+    if os.name != "nt":
+        fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        return
+    fh.seek(0)
+    while True:  # pragma: no cover
+        try:
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK gives up after ~10 s of retries; keep waiting like flock does.
+            time.sleep(0.1)
+
+
+def _unlock(fh: IO[bytes]) -> None:
+    if os.name != "nt":
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+        return
+    fh.seek(0)  # pragma: no cover
+    msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)  # pragma: no cover
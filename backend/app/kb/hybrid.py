@@ -0,0 +1,27 @@
+import re
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 MATCH expression: any of the quoted terms, so operators in user input are inert."""
+    terms = dict.fromkeys(token.lower() for token in _TOKEN.findall(text))
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+def reciprocal_rank_fusion(rankings: list[np.ndarray], top_k: int, k: int = 60) -> tuple[np.ndarray, np.ndarray]:
+    """Merge id rankings by summing 1 / (k + rank); ties keep first-seen order."""
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row_id in enumerate(ranking, start=1):
+            row_id = int(row_id)
+            if row_id < 0:
+                continue
+            fused[row_id] = fused.get(row_id, 0.0) + 1.0 / (k + rank)
+    ordered = sorted(fused.items(), key=lambda item: -item[1])[:top_k]
+    return (
+        np.array([score for _, score in ordered], dtype=np.float32),
+        np.array([row_id for row_id, _ in ordered], dtype=np.int64),
+    )
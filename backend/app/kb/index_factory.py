@@ -0,0 +1,146 @@
+import math
+from typing import Any, Iterable
+
+import numpy as np
+
+from app.core.config import Settings
+from app.kb.layered import LayeredIndex
+
+try:
+    import faiss  # type: ignore
+except Exception:  # pragma: no cover
+    faiss = None
+
+
+# FAISS codec per `kb_vector_storage`; float16 halves and int8 quarters the resident vectors.
+_CODECS = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+# Below this many vectors an int8 quantizer keeps the fixed [-1, 1] range instead of learning one.
+_MIN_SQ_TRAIN = 1000
+
+
+def new_index(kind: str, dim: int, settings: Settings, n_vectors: int = 0) -> Any:
+    """Create an IDMap2-wrapped inner-product index of the requested kind (IVF kinds still need training)."""
+    codec = _CODECS[settings.kb_vector_storage]
+    if kind == "flat":
+        spec = f"IDMap2,{codec}"
+    elif kind == "hnsw":
+        spec = f"IDMap2,HNSW{settings.kb_hnsw_m}" + ("" if codec == "Flat" else f",{codec}")
+    elif kind == "ivf_flat":
+        spec = f"IDMap2,IVF{_nlist(settings, n_vectors)},{codec}"
+    elif kind == "ivf_pq":
+        spec = f"IDMap2,IVF{_nlist(settings, n_vectors)},PQ{_pq_m(dim, settings.kb_pq_m)}"
+    else:
+        raise ValueError(f"Unknown index type: {kind}")
+    index = faiss.index_factory(dim, spec, faiss.METRIC_INNER_PRODUCT)
+    if kind == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efConstruction = settings.kb_hnsw_ef_construction
+    if not kind.startswith("ivf") and not index.is_trained:
+        # Vectors are L2-normalized, so every component lies in [-1, 1]; a rebuild retrains on real data.
+        index.train(np.vstack([-np.ones(dim), np.ones(dim)]).astype(np.float32))
+    return index
+
+
+def training_size(kind: str, settings: Settings, n_vectors: int) -> int:
+    if not kind.startswith("ivf"):
+        if settings.kb_vector_storage != "int8" or n_vectors < _MIN_SQ_TRAIN:
+            return 0
+        return min(n_vectors, settings.kb_ann_train_sample)
+    # k-means wants roughly 39 points per centroid (and PQ codebooks need 256 per sub-quantizer).
+    wanted = max(settings.kb_ann_train_sample, _nlist(settings, n_vectors) * 39)
+    if kind == "ivf_pq":
+        wanted = max(wanted, 256 * 39)
+    return min(n_vectors, wanted)
+
+
+def index_kind(index: Any) -> str:
+    if isinstance(index, LayeredIndex):
+        index = index.base
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(inner, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def index_storage(index: Any) -> str:
+    """How the index holds vectors: "float32", "float16", "int8" or "pq"."""
+    if isinstance(index, LayeredIndex):
+        index = index.base
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        inner = faiss.downcast_index(inner.storage)
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "pq"
+    sq = getattr(inner, "sq", None)
+    if sq is None:
+        return "float32"
+    return {faiss.ScalarQuantizer.QT_8bit: "int8", faiss.ScalarQuantizer.QT_fp16: "float16"}.get(sq.qtype, "float32")
+
+
+def index_bytes(index: Any) -> int:
+    """Approximate memory held by an index: vector codes, id maps and HNSW links (mapped pages included)."""
+    if isinstance(index, LayeredIndex):
+        return index_bytes(index.base) + index_bytes(index.delta)
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    # IDMap2 keeps an id array plus its reverse map.
+    extra = 16 * index.ntotal if inner is not index else 0
+    if isinstance(inner, faiss.IndexHNSW):
+        extra += inner.hnsw.neighbors.size() * 4
+        inner = faiss.downcast_index(inner.storage)
+    try:
+        code_size = inner.sa_code_size()
+    except RuntimeError:
+        code_size = 4 * inner.d
+    return index.ntotal * code_size + extra
+
+
+def search_params(index: Any, settings: Settings, nprobe: int | None = None, ef_search: int | None = None, sel: Any = None) -> Any:
+    kind = index_kind(index)
+    if kind.startswith("ivf"):
+        return faiss.SearchParametersIVF(sel=sel, nprobe=nprobe or settings.kb_nprobe)
+    if kind == "hnsw":
+        return faiss.SearchParametersHNSW(sel=sel, efSearch=ef_search or settings.kb_ef_search)
+    return faiss.SearchParameters(sel=sel) if sel is not None else None
+
+
+def exact_search(batches: Iterable[tuple[np.ndarray, np.ndarray]], queries: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force top-k ids over streamed (ids, vectors) batches without holding them all in memory."""
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+    for ids, vectors in batches:
+        if not len(ids):
+            continue
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = 1.0
+        scores = queries @ (vectors / norms[:, None]).T
+        merged_scores = np.hstack([best_scores, scores])
+        merged_ids = np.hstack([best_ids, np.broadcast_to(ids, scores.shape)])
+        top = np.argsort(-merged_scores, axis=1, kind="stable")[:, :k]
+        best_scores = np.take_along_axis(merged_scores, top, axis=1)
+        best_ids = np.take_along_axis(merged_ids, top, axis=1)
+    return best_ids
+
+
+def recall_at_k(candidate_ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    """Mean fraction of the exact top-k ids that the candidate search also returned."""
+    hits = 0
+    total = 0
+    for got, want in zip(candidate_ids, exact_ids):
+        want_set = {int(i) for i in want if i >= 0}
+        hits += len(want_set.intersection(int(i) for i in got if i >= 0))
+        total += len(want_set)
+    return hits / total if total else 1.0
+
+
+def _nlist(settings: Settings, n_vectors: int) -> int:
+    if settings.kb_ivf_nlist:
+        return settings.kb_ivf_nlist
+    return int(min(65536, max(16, 4 * math.sqrt(max(n_vectors, 1)))))
+
+
+def _pq_m(dim: int, requested: int) -> int:
+    # PQ needs the sub-quantizer count to divide the dimension.
+    return next(m for m in range(min(requested, dim), 0, -1) if dim % m == 0)
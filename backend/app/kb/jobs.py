@@ -0,0 +1,115 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import BinaryIO
+
+from app.core.config import Settings
+from app.core.errors import AppError
+from app.kb.service import KBService
+from app.schemas import DEFAULT_NAMESPACE
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestJob:
+    job_id: str
+    filename: str
+    doc_id: str
+    namespace: str = DEFAULT_NAMESPACE
+    status: str = "queued"
+    chunks_embedded: int = 0
+    chunks_indexed: int = 0
+    error: dict[str, str] | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    @property
+    def chunks_per_s(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.chunks_indexed / elapsed if elapsed > 0 else 0.0
+
+
+class IngestJobQueue:
+    """Runs document ingestion on a small fixed pool of worker threads.
+
+    At most `kb_ingest_workers` documents ingest at once and at most
+    `kb_ingest_queue_size` wait behind them, so upload bursts cannot take over the
+    embedding provider or the SQLite writer from queries and simulations.
+    """
+
+    def __init__(self, kb_service: KBService, settings: Settings):
+        self._kb = kb_service
+        self._workers = ThreadPoolExecutor(max_workers=settings.kb_ingest_workers, thread_name_prefix="kb-ingest")
+        self._capacity = settings.kb_ingest_workers + settings.kb_ingest_queue_size
+        self._history = settings.kb_ingest_job_history
+        self._jobs: OrderedDict[str, IngestJob] = OrderedDict()
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def submit(
+        self, filename: str, stream: BinaryIO, replace: bool = False, namespace: str = DEFAULT_NAMESPACE
+    ) -> IngestJob:
+        """Queue `stream` for ingestion; the queue takes ownership and closes it when the job ends."""
+        with self._lock:
+            if self._active >= self._capacity:
+                raise AppError(code="ingest_queue_full", message="Too many uploads in progress. Retry shortly.", status_code=429)
+            self._active += 1
+            job = IngestJob(job_id=str(uuid.uuid4()), filename=filename, doc_id=str(uuid.uuid4()), namespace=namespace)
+            self._jobs[job.job_id] = job
+            self._trim_history()
+        self._workers.submit(self._run, job, stream, replace)
+        return job
+
+    def get(self, job_id: str) -> IngestJob:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise AppError(code="job_not_found", message=f"No ingestion job {job_id}.", status_code=404)
+        return job
+
+    def shutdown(self) -> None:
+        self._workers.shutdown(wait=True)
+
+    def _run(self, job: IngestJob, stream: BinaryIO, replace: bool) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+
+        def progress(embedded: int, indexed: int) -> None:
+            job.chunks_embedded = embedded
+            job.chunks_indexed = indexed
+
+        try:
+            self._kb.upload_document(
+                job.filename, stream, doc_id=job.doc_id, progress=progress, replace=replace, namespace=job.namespace
+            )
+            job.status = "succeeded"
+        except AppError as exc:
+            job.status = "failed"
+            job.error = {"code": exc.code, "message": exc.message}
+        except Exception:
+            logger.exception("kb_ingest_job_failed", extra={"job_id": job.job_id})
+            job.status = "failed"
+            job.error = {"code": "internal_error", "message": "Unexpected ingestion error."}
+        finally:
+            stream.close()
+            job.finished_at = time.time()
+            with self._lock:
+                self._active -= 1
+            logger.info(
+                "kb_ingest_job_finished",
+                extra={"job_id": job.job_id, "status": job.status, "chunks": job.chunks_indexed, "chunks_per_s": job.chunks_per_s},
+            )
+
+    def _trim_history(self) -> None:
+        # Forget the oldest finished jobs; queued and running jobs are always kept.
+        excess = len(self._jobs) - self._history
+        for job_id in [j.job_id for j in self._jobs.values() if j.finished_at is not None][: max(excess, 0)]:
+            del self._jobs[job_id]
@@ -0,0 +1,61 @@
+from typing import Any
+
+import numpy as np
+
+try:
+    import faiss  # type: ignore
+except Exception:  # pragma: no cover
+    faiss = None
+
+
+class LayeredIndex:
+    """A read-only memory-mapped base snapshot plus a small in-memory delta for newer vectors.
+
+    Every worker maps the same base file, so its pages are shared through the OS page
+    cache; only vectors added since the last full snapshot are held privately. Adds go
+    to the delta, and searches run on both layers and merge by score.
+    """
+
+    def __init__(self, base: Any, delta: Any):
+        self.base = base
+        self.delta = delta
+
+    @property
+    def d(self) -> int:
+        return self.base.d
+
+    @property
+    def ntotal(self) -> int:
+        return self.base.ntotal + self.delta.ntotal
+
+    def add_with_ids(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        self.delta.add_with_ids(vectors, ids)
+
+    def search(self, queries: np.ndarray, k: int, params: Any = None) -> tuple[np.ndarray, np.ndarray]:
+        scores, ids = self.base.search(queries, k, params=params)
+        if not self.delta.ntotal:
+            return scores, ids
+        delta_scores, delta_ids = self.delta.search(queries, k, params=params)
+        scores, ids = np.hstack([scores, delta_scores]), np.hstack([ids, delta_ids])
+        top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(scores, top, axis=1), np.take_along_axis(ids, top, axis=1)
+
+
+def map_index(path: str) -> Any:
+    """Open an index snapshot read-only with its vector data memory-mapped rather than copied."""
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # The flat-codes mapping reader cannot open IVF lists; those map through IO_FLAG_MMAP instead.
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+
+
+def index_ids(index: Any) -> np.ndarray:
+    if isinstance(index, LayeredIndex):
+        return np.concatenate([index_ids(index.base), index_ids(index.delta)])
+    return faiss.vector_to_array(index.id_map)
+
+
+def newest_id(index: Any) -> int:
+    ids = index_ids(index)
+    return int(ids.max()) if len(ids) else 0
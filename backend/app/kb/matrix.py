@@ -0,0 +1,172 @@
+import numpy as np
+
+_MIN_CAPACITY = 1024
+# Upper bound on the (queries x rows) score block materialized at once by search_batch.
+_BATCH_SCORE_ELEMENTS = 1 << 24
+# Quantized rows are widened to float32 this many at a time while scoring.
+_DECODE_ROWS = 16_384
+# Storage dtype and the factor that maps stored values back to unit-vector components.
+_STORAGE = {"float32": (np.float32, 1.0), "float16": (np.float16, 1.0), "int8": (np.int8, 1 / 127)}
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class VectorMatrix:
+    """Resident, pre-normalized vector matrix with a parallel int64 chunk-id array.
+
+    Rows are appended into spare capacity that grows geometrically, so ingest is
+    amortized O(1) per vector and search is a single matrix-vector product. With
+    `storage` set to "float16" or "int8" rows are kept quantized and scores are
+    approximate; callers rerank the top candidates against exact vectors.
+    """
+
+    def __init__(self, dim: int | None = None, storage: str = "float32"):
+        self._dim = dim
+        self._storage = storage
+        self._dtype, self._scale = _STORAGE[storage]
+        self._size = 0
+        self._data = np.empty((0, dim or 0), dtype=self._dtype)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._alive = np.empty(0, dtype=bool)
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dead(self) -> int:
+        return self._dead
+
+    @property
+    def dim(self) -> int | None:
+        return self._dim
+
+    @property
+    def storage(self) -> str:
+        return self._storage
+
+    @property
+    def nbytes(self) -> int:
+        return self._data[: self._size].nbytes
+
+    def append(self, ids: list[int] | np.ndarray, vectors: np.ndarray) -> None:
+        if not len(ids):
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self._dim is None:
+            self._dim = vectors.shape[1]
+            self._data = np.empty((0, self._dim), dtype=self._dtype)
+        if vectors.shape[1] != self._dim:
+            raise ValueError(f"Embedding dim {vectors.shape[1]} does not match index dim {self._dim}")
+        needed = self._size + len(ids)
+        if needed > self._data.shape[0]:
+            self._grow(needed)
+        self._data[self._size:needed] = self._encode(normalize_rows(vectors))
+        self._ids[self._size:needed] = ids
+        self._alive[self._size:needed] = True
+        # Publish the new size last so concurrent readers never see unwritten rows.
+        self._size = needed
+
+    def search(self, query: np.ndarray, top_k: int, allowed: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k rows by cosine similarity; `allowed` restricts scoring to those chunk ids."""
+        size = self._size
+        if size == 0 or top_k <= 0 or query.shape[0] != self._dim:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        q = query.astype(np.float32, copy=False)
+        q = q / (np.linalg.norm(q) or 1.0)
+        if allowed is None:
+            rows = None
+            scores = self._dot(slice(0, size), q)
+            if self._dead:
+                scores[~self._alive[:size]] = -np.inf
+        else:
+            rows = np.flatnonzero(np.isin(self._ids[:size], allowed) & self._alive[:size])
+            scores = self._dot(rows, q)
+        k = min(top_k, len(scores))
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[np.isfinite(scores[top])]
+        return scores[top], self._ids[top if rows is None else rows[top]]
+
+    def search_batch(self, queries: np.ndarray, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k for each row of an (n x dim) query matrix as (n x k) scores and ids, best first."""
+        size = self._size
+        n = queries.shape[0]
+        if size == 0 or top_k <= 0 or queries.shape[1] != self._dim:
+            return np.empty((n, 0), dtype=np.float32), np.empty((n, 0), dtype=np.int64)
+        q = normalize_rows(queries.astype(np.float32, copy=False))
+        k = min(top_k, size)
+        out_scores = np.empty((n, k), dtype=np.float32)
+        out_ids = np.empty((n, k), dtype=np.int64)
+        block = max(1, _BATCH_SCORE_ELEMENTS // size)
+        for start in range(0, n, block):
+            scores = self._dot(slice(0, size), q[start : start + block].T).T
+            if self._dead:
+                scores[:, ~self._alive[:size]] = -np.inf
+            if k < size:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(size), scores.shape)
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            out_scores[start : start + block] = np.take_along_axis(top_scores, order, axis=1)
+            out_ids[start : start + block] = self._ids[np.take_along_axis(top, order, axis=1)]
+        # Dead rows can only surface when fewer than k live rows exist; report them as empty slots.
+        out_ids[~np.isfinite(out_scores)] = -1
+        return out_scores, out_ids
+
+    def tombstone(self, ids: list[int] | np.ndarray) -> int:
+        """Mark rows dead so searches skip them; returns how many live rows were hit."""
+        size = self._size
+        ids = np.asarray(ids, dtype=np.int64)
+        # Ids are appended in increasing order, so a binary search finds their rows.
+        rows = np.searchsorted(self._ids[:size], ids)
+        rows = rows[(rows < size)]
+        rows = rows[np.isin(self._ids[rows], ids) & self._alive[rows]]
+        self._alive[rows] = False
+        self._dead += len(rows)
+        return len(rows)
+
+    def compacted(self) -> "VectorMatrix":
+        """A copy without dead rows; callers swap it in so concurrent readers keep a consistent view."""
+        keep = np.flatnonzero(self._alive[: self._size])
+        matrix = VectorMatrix(self._dim, self._storage)
+        # Copy the stored rows as they are; decoding and re-encoding would compound quantization error.
+        matrix._data, matrix._ids = self._data[keep], self._ids[keep]
+        matrix._alive = np.ones(len(keep), dtype=bool)
+        matrix._size = len(keep)
+        return matrix
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self._dtype is np.int8:
+            return np.clip(np.rint(vectors * 127), -127, 127)
+        return vectors
+
+    def _dot(self, rows: slice | np.ndarray, q: np.ndarray) -> np.ndarray:
+        """Scores of the stored `rows` against `q` (a vector, or dim x n), computed in float32."""
+        data = self._data[rows]
+        if self._dtype is np.float32:
+            return data @ q
+        scores = np.empty((len(data),) + q.shape[1:], dtype=np.float32)
+        for start in range(0, len(data), _DECODE_ROWS):
+            scores[start : start + _DECODE_ROWS] = data[start : start + _DECODE_ROWS].astype(np.float32) @ q
+        if self._scale != 1.0:
+            scores *= self._scale
+        return scores
+
+    def _grow(self, needed: int) -> None:
+        capacity = max(needed, _MIN_CAPACITY, self._data.shape[0] * 2)
+        data = np.empty((capacity, self._dim), dtype=self._dtype)
+        data[: self._size] = self._data[: self._size]
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[: self._size] = self._ids[: self._size]
+        alive = np.empty(capacity, dtype=bool)
+        alive[: self._size] = self._alive[: self._size]
+        self._data, self._ids, self._alive = data, ids, alive
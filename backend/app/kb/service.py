@@ -1,54 +1,282 @@
+import logging
+import unicodedata
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import ExitStack
 from io import BytesIO
-from pathlib import Path
+from itertools import chain, islice
+from typing import Any, BinaryIO, Callable, TypeVar
 
+from app.core.cache import LRUCache, SingleFlight
 from app.core.errors import AppError
-from app.core.config import get_settings
-from app.kb.chunker import chunk_text
+from app.core.config import Settings, get_settings
+from app.kb.chunker import iter_chunks, iter_document_text
+from app.kb.embedding_cache import CachedEmbeddingProvider, EmbeddingCache
+from app.kb.hybrid import reciprocal_rank_fusion
+from app.kb.shards import ShardSet
 from app.kb.store import KBStore
 from app.providers.interfaces import EmbeddingProvider
+from app.schemas import DEFAULT_NAMESPACE
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 
 class KBService:
-    def __init__(self, embedding_provider: EmbeddingProvider):
-        settings = get_settings()
-        self._store = KBStore(settings.kb_db_path, settings.kb_index_path)
+    def __init__(self, embedding_provider: EmbeddingProvider, settings: Settings | None = None):
+        settings = settings or get_settings()
+        self._shards = ShardSet(settings)
+        self._embedding_cache = None
         self._embedder = embedding_provider
+        if settings.kb_embedding_cache_enabled:
+            self._embedding_cache = EmbeddingCache(settings.kb_embedding_cache_path, settings)
+            self._embedder = CachedEmbeddingProvider(embedding_provider, self._embedding_cache)
         self._chunk_size = settings.kb_chunk_size
         self._chunk_overlap = settings.kb_chunk_overlap
+        self._ingest_batch_size = settings.kb_ingest_batch_size
+        self._read_block_bytes = settings.kb_ingest_read_block_bytes
+        self._context_top_k = settings.kb_context_top_k
+        self._hybrid_candidates = settings.kb_hybrid_candidates
+        self._hybrid_budget_s = settings.kb_hybrid_budget_ms / 1000
+        self._rrf_k = settings.kb_rrf_k
+        self._keyword_pool = ThreadPoolExecutor(max_workers=settings.kb_hybrid_workers, thread_name_prefix="kb-keyword")
+        self._fanout_pool = ThreadPoolExecutor(max_workers=settings.kb_shard_fanout_workers, thread_name_prefix="kb-shard")
+        self._query_embeddings: LRUCache[tuple[str, str], list[float]] = LRUCache(
+            settings.kb_query_cache_size, ttl_s=settings.kb_query_cache_ttl_s
+        )
+        self._query_flight: SingleFlight[tuple[str, str], list[float]] = SingleFlight()
+        # Keyed on each searched shard's generation, so any write makes earlier entries unreachable.
+        self._results: LRUCache[tuple, list[dict]] = LRUCache(settings.kb_result_cache_size, ttl_s=settings.kb_query_cache_ttl_s)
+
+    def upload_document(
+        self,
+        filename: str,
+        data: bytes | BinaryIO,
+        doc_id: str | None = None,
+        progress: Callable[[int, int], None] | None = None,
+        replace: bool = False,
+        namespace: str = DEFAULT_NAMESPACE,
+    ) -> tuple[str, int]:
+        """Chunk, embed and commit a document in fixed-size batches so memory does not grow with its size.
+
+        `progress` receives the running (embedded, indexed) chunk counts after each step.
+        If any batch fails the chunks already committed for the document are removed again.
+        With `replace`, earlier documents from the same source are deleted once the new one is in.
+        The document goes into `namespace`, which is created on first upload.
+        """
+        with self._shards.lease(namespace, create=True) as store:
+            return self._upload(store, filename, data, doc_id, progress, replace)
 
-    def upload_document(self, filename: str, data: bytes) -> tuple[str, int]:
-        text = self._extract_text(filename, data)
-        chunks = chunk_text(text, chunk_size=self._chunk_size, overlap=self._chunk_overlap)
+    def _upload(
+        self,
+        store: KBStore,
+        filename: str,
+        data: bytes | BinaryIO,
+        doc_id: str | None,
+        progress: Callable[[int, int], None] | None,
+        replace: bool,
+    ) -> tuple[str, int]:
+        stream = BytesIO(data) if isinstance(data, bytes) else data
+        text = iter_document_text(filename, stream, self._read_block_bytes)
+        chunks = iter_chunks(text, chunk_size=self._chunk_size, overlap=self._chunk_overlap)
+        doc_id = doc_id or str(uuid.uuid4())
+        embedded = 0
+        total = 0
         try:
-            embeddings = self._embedder.embed_texts(chunks) if chunks else []
-        except Exception as exc:
-            raise AppError(
-                code="embedding_unavailable",
-                message="Embedding provider unavailable. Check Bedrock access/model settings.",
-                status_code=503,
-            ) from exc
-        return self._store.add_chunks(source=filename, chunks=chunks, embeddings=embeddings)
+            while batch := list(islice(chunks, self._ingest_batch_size)):
+                try:
+                    embeddings = self._embedder.embed_texts(batch)
+                except Exception as exc:
+                    raise AppError(
+                        code="embedding_unavailable",
+                        message="Embedding provider unavailable. Check Bedrock access/model settings.",
+                        status_code=503,
+                    ) from exc
+                embedded += len(batch)
+                if progress:
+                    progress(embedded, total)
+                _, added = store.add_chunks(source=filename, chunks=batch, embeddings=embeddings, doc_id=doc_id)
+                total += added
+                if progress:
+                    progress(embedded, total)
+        except BaseException:
+            if total:
+                store.delete_document(doc_id)
+                logger.warning("kb_partial_document_removed", extra={"doc_id": doc_id, "chunks": total})
+            raise
+        if replace:
+            for old_doc_id in store.doc_ids_for_source(filename):
+                if old_doc_id != doc_id:
+                    store.delete_document(old_doc_id)
+                    logger.info("kb_document_replaced", extra={"doc_id": old_doc_id, "replaced_by": doc_id})
+        return doc_id, total
+
+    def delete_document(self, doc_id: str, namespace: str = DEFAULT_NAMESPACE) -> int:
+        with self._shards.lease(namespace) as store:
+            deleted = store.delete_document(doc_id)
+        if not deleted:
+            raise AppError(code="document_not_found", message=f"No document {doc_id}.", status_code=404)
+        return deleted
+
+    def stats(self, namespace: str = DEFAULT_NAMESPACE) -> dict:
+        with self._shards.lease(namespace) as store:
+            store_stats = store.stats()
+        return {**store_stats, "namespace": namespace, "shards": self._shards.stats(), "caches": self.cache_stats()}
+
+    def cache_stats(self) -> dict[str, dict]:
+        return {
+            "chunk_embeddings": self._embedding_cache.stats() if self._embedding_cache else {},
+            "query_embeddings": {**self._query_embeddings.stats(), "single_flight_shared": self._query_flight.shared},
+            "results": self._results.stats(),
+        }
 
-    def query(self, query: str, top_k: int) -> list[dict]:
+    def query(
+        self,
+        query: str,
+        top_k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        mode: str = "vector",
+        namespace: str | list[str] = DEFAULT_NAMESPACE,
+    ) -> list[dict]:
+        """Top-k matches in `namespace`; a list of namespaces is searched concurrently and merged by score."""
+        with ExitStack() as leases:
+            stores = self._lease_all(leases, namespace)
+            generations = tuple((ns, store.generation) for ns, store in stores.items())
+            key = (mode, _normalize_query(query), top_k, nprobe, ef_search, generations)
+            cached = self._results.get(key)
+            if cached is not None:
+                return [dict(m) for m in cached]
+            if mode == "hybrid":
+                shard_results = self._fan_out(
+                    stores, lambda store: self._hybrid_query(store, query, top_k, nprobe=nprobe, ef_search=ef_search)
+                )
+            else:
+                vec = self._embed_query(query)
+                shard_results = self._fan_out(
+                    stores, lambda store: (store.search(vec, top_k, nprobe=nprobe, ef_search=ef_search), True)
+                )
+        matches = _merge([_tag(matches, ns) for ns, (matches, _) in zip(stores, shard_results)], top_k)
+        if all(complete for _, complete in shard_results):
+            self._results.put(key, [dict(m) for m in matches])
+        return matches
+
+    def query_batch(
+        self,
+        queries: list[str],
+        top_k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        namespace: str | list[str] = DEFAULT_NAMESPACE,
+    ) -> list[list[dict]]:
+        """Vector search for many queries: one embedding batch for the uncached ones and one index scan per shard."""
+        with ExitStack() as leases:
+            stores = self._lease_all(leases, namespace)
+            vectors = self._embed_queries(queries)
+            shard_results = self._fan_out(
+                stores, lambda store: store.search_batch(vectors, top_k, nprobe=nprobe, ef_search=ef_search)
+            )
+        tagged = [[_tag(matches, ns) for matches in results] for ns, results in zip(stores, shard_results)]
+        return [_merge(per_query, top_k) for per_query in zip(*tagged)]
+
+    def _lease_all(self, leases: ExitStack, namespace: str | list[str]) -> dict[str, KBStore]:
+        namespaces = [namespace] if isinstance(namespace, str) else list(dict.fromkeys(namespace))
+        return {ns: leases.enter_context(self._shards.lease(ns)) for ns in namespaces}
+
+    def _fan_out(self, stores: dict[str, KBStore], search: Callable[[KBStore], T]) -> list[T]:
+        """Run `search` on every shard, concurrently when there is more than one; results follow `stores`."""
+        if len(stores) == 1:
+            return [search(next(iter(stores.values())))]
+        return list(self._fanout_pool.map(search, stores.values()))
+
+    def _embed_queries(self, queries: list[str]) -> list[list[float]]:
+        keys = [(self._embedder.model_id, _normalize_query(q)) for q in queries]
+        vectors = {key: vec for key in keys if (vec := self._query_embeddings.get(key)) is not None}
+        missing: dict[tuple[str, str], str] = {}
+        for key, query in zip(keys, queries):
+            if key not in vectors:
+                missing.setdefault(key, query)
+        if missing:
+            try:
+                fresh = self._embedder.embed_queries(list(missing.values()))
+            except Exception as exc:
+                raise AppError(
+                    code="embedding_unavailable",
+                    message="Embedding provider unavailable. Check Bedrock access/model settings.",
+                    status_code=503,
+                ) from exc
+            for key, vec in zip(missing, fresh):
+                self._query_embeddings.put(key, vec)
+                vectors[key] = vec
+        return [vectors[key] for key in keys]
+
+    def _hybrid_query(
+        self, store: KBStore, query: str, top_k: int, nprobe: int | None, ef_search: int | None
+    ) -> tuple[list[dict], bool]:
+        """Fuse BM25 and vector rankings with RRF; the keyword leg runs while the query is embedded.
+
+        Once the vector leg is done the keyword leg gets at most the hybrid latency budget;
+        if it is slower the vector ranking is returned on its own and flagged as incomplete.
+        """
+        candidates = max(top_k, self._hybrid_candidates)
+        keyword = self._keyword_pool.submit(store.rank_keywords, query, candidates)
+        _, vector_ids = store.rank(self._embed_query(query), candidates, nprobe=nprobe, ef_search=ef_search)
+        complete = True
         try:
-            q = self._embedder.embed_query(query)
+            _, keyword_ids = keyword.result(timeout=self._hybrid_budget_s)
+        except FutureTimeoutError:
+            logger.warning("kb_keyword_search_over_budget", extra={"budget_ms": self._hybrid_budget_s * 1000})
+            keyword_ids, complete = [], False
+        except Exception:
+            logger.exception("kb_keyword_search_failed")
+            keyword_ids, complete = [], False
+        scores, ids = reciprocal_rank_fusion([vector_ids, keyword_ids], top_k, k=self._rrf_k)
+        return store.hydrate(scores, ids), complete
+
+    def _embed_query(self, query: str) -> list[float]:
+        """Embed a query through the TTL/LRU cache; concurrent misses for the same query share one call."""
+        key = (self._embedder.model_id, _normalize_query(query))
+        cached = self._query_embeddings.get(key)
+        if cached is not None:
+            return cached
+        try:
+            return self._query_flight.do(key, lambda: self._fetch_query_embedding(key, query))
         except Exception as exc:
             raise AppError(
                 code="embedding_unavailable",
                 message="Embedding provider unavailable. Check Bedrock access/model settings.",
                 status_code=503,
             ) from exc
-        return self._store.search(q, top_k)
 
-    def context_for_docs(self, doc_ids: list[str]) -> list[str]:
-        return self._store.fetch_context_by_doc_ids(doc_ids)
+    def _fetch_query_embedding(self, key: tuple[str, str], query: str) -> list[float]:
+        vec = self._embedder.embed_query(query)
+        self._query_embeddings.put(key, vec)
+        return vec
+
+    def context_for_docs(self, doc_ids: list[str], decision_text: str, namespace: str = DEFAULT_NAMESPACE) -> list[str]:
+        """Most relevant chunks to the decision, restricted to the given documents."""
+        if not doc_ids:
+            return []
+        with self._shards.lease(namespace) as store:
+            try:
+                q = self._embed_query(decision_text)
+            except AppError:
+                logger.warning("kb_context_embedding_failed", extra={"doc_ids": len(doc_ids)})
+                return store.fetch_context_by_doc_ids(doc_ids, limit=self._context_top_k)
+            matches = store.search(q, self._context_top_k, doc_ids=doc_ids)
+        return [m["text"] for m in matches]
+
+
+def _tag(matches: list[dict[str, Any]], namespace: str) -> list[dict[str, Any]]:
+    return [{**m, "namespace": namespace} for m in matches]
+
+
+def _merge(shard_matches: list[list[dict[str, Any]]], top_k: int) -> list[dict[str, Any]]:
+    if len(shard_matches) == 1:
+        return shard_matches[0][:top_k]
+    return sorted(chain.from_iterable(shard_matches), key=lambda m: m["score"], reverse=True)[:top_k]
 
-    @staticmethod
-    def _extract_text(filename: str, data: bytes) -> str:
-        suffix = Path(filename).suffix.lower()
-        if suffix == ".pdf":
-            from pypdf import PdfReader
 
-            reader = PdfReader(BytesIO(data))
-            return "\n".join(page.extract_text() or "" for page in reader.pages)
-        return data.decode("utf-8", errors="ignore")
+def _normalize_query(query: str) -> str:
+    return unicodedata.normalize("NFC", " ".join(query.split()))
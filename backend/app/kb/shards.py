@@ -0,0 +1,131 @@
+import logging
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from app.core.config import Settings
+from app.core.errors import AppError
+from app.kb.store import KBStore
+from app.schemas import DEFAULT_NAMESPACE, NAMESPACE_PATTERN
+
+logger = logging.getLogger(__name__)
+
+_NAMESPACE_RE = re.compile(NAMESPACE_PATTERN)
+
+
+class ShardSet:
+    """One `KBStore` per namespace, opened on first use and evicted under a memory budget.
+
+    Callers lease a shard for the duration of a request; leased shards are never
+    closed. When the loaded indexes together exceed `kb_shard_memory_budget_mb`, idle
+    shards are closed least-recently-used first, always keeping the latest one loaded.
+    The default namespace lives at `kb_db_path`/`kb_index_path`, the others under
+    `kb_namespace_dir/<namespace>/`.
+    """
+
+    def __init__(self, settings: Settings):
+        self._settings = settings
+        self._dir = Path(settings.kb_namespace_dir)
+        self._budget_bytes = int(settings.kb_shard_memory_budget_mb * 1024 * 1024)
+        self._shards: OrderedDict[str, KBStore] = OrderedDict()
+        self._leases: dict[str, int] = {}
+        self._open_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def paths(self, namespace: str) -> tuple[str, str]:
+        if namespace == DEFAULT_NAMESPACE:
+            return self._settings.kb_db_path, self._settings.kb_index_path
+        root = self._dir / namespace
+        return str(root / "kb.sqlite3"), str(root / "kb.faiss")
+
+    def exists(self, namespace: str) -> bool:
+        return namespace == DEFAULT_NAMESPACE or Path(self.paths(namespace)[0]).exists()
+
+    @contextmanager
+    def lease(self, namespace: str, create: bool = False) -> Iterator[KBStore]:
+        """Hold the namespace's store open; unknown namespaces are 404s unless `create`."""
+        store = self._acquire(namespace, create)
+        try:
+            yield store
+        finally:
+            with self._lock:
+                self._leases[namespace] -= 1
+            self._evict()
+
+    def loaded(self) -> list[str]:
+        with self._lock:
+            return list(self._shards)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            stores = list(self._shards.values())
+        return {
+            "loaded": len(stores),
+            "memory_bytes": sum(store.memory_bytes() for store in stores),
+            "budget_bytes": self._budget_bytes,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            stores = list(self._shards.values())
+            self._shards.clear()
+            self._leases.clear()
+        for store in stores:
+            store.close()
+
+    def _acquire(self, namespace: str, create: bool) -> KBStore:
+        if not _NAMESPACE_RE.match(namespace):
+            raise AppError(code="invalid_namespace", message=f"Invalid namespace {namespace!r}.", status_code=422)
+        with self._lock:
+            store = self._take(namespace)
+            if store is not None:
+                return store
+            open_lock = self._open_locks.setdefault(namespace, threading.Lock())
+        # Opening loads the index, so concurrent first requests for one namespace wait for a single load.
+        with open_lock:
+            with self._lock:
+                store = self._take(namespace)
+            if store is not None:
+                return store
+            if not create and not self.exists(namespace):
+                raise AppError(code="namespace_not_found", message=f"No namespace {namespace}.", status_code=404)
+            store = KBStore(*self.paths(namespace), self._settings)
+            with self._lock:
+                self._shards[namespace] = store
+                self._leases[namespace] = 1
+        logger.info("kb_shard_loaded", extra={"namespace": namespace, "memory_bytes": store.memory_bytes()})
+        self._evict()
+        return store
+
+    def _take(self, namespace: str) -> KBStore | None:
+        store = self._shards.get(namespace)
+        if store is not None:
+            self._shards.move_to_end(namespace)
+            self._leases[namespace] += 1
+        return store
+
+    def _evict(self) -> None:
+        with self._lock:
+            loaded = list(self._shards.items())
+        # Sized outside the set lock: a store may be busy catching up.
+        sizes = {namespace: store.memory_bytes() for namespace, store in loaded}
+        total = sum(sizes.values())
+        victims = []
+        with self._lock:
+            for namespace in list(self._shards)[:-1]:
+                if total <= self._budget_bytes:
+                    break
+                if self._leases[namespace] or namespace not in sizes:
+                    continue
+                victims.append((namespace, self._shards.pop(namespace)))
+                del self._leases[namespace]
+                total -= sizes[namespace]
+            self.evictions += len(victims)
+        for namespace, store in victims:
+            store.close()
+            logger.info("kb_shard_evicted", extra={"namespace": namespace, "memory_bytes": sizes[namespace]})
@@ -1,127 +1,948 @@
 import json
+import logging
+import os
 import sqlite3
+import threading
+import time
 import uuid
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 import numpy as np
 
+from app.core.cache import LRUCache
+from app.core.config import Settings, get_settings
+from app.kb.db import SQLitePool
+from app.kb.filelock import FileLock
+from app.kb.hybrid import fts_query
+from app.kb.index_factory import (
+    exact_search,
+    index_bytes,
+    index_kind,
+    index_storage,
+    new_index,
+    recall_at_k,
+    search_params,
+    training_size,
+)
+from app.kb.layered import LayeredIndex, index_ids, map_index, newest_id
+from app.kb.matrix import VectorMatrix, normalize_rows
+from app.kb.tombstones import Tombstones
+from app.kb.vectors import pack_vector, unpack_vector
+
 try:
     import faiss  # type: ignore
 except Exception:  # pragma: no cover
     faiss = None
 
+logger = logging.getLogger(__name__)
+
+_MIGRATION_BATCH = 500
+_LOAD_BATCH = 4096
+_EMPTY_RANKING = (np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64))
+# Counters in `kb_meta`: any write, tombstone changes, and a published full snapshot.
+_META_KEYS = ("generation", "deletes", "snapshot")
+
+
+def _bump(conn: sqlite3.Connection, *keys: str) -> None:
+    conn.executemany("UPDATE kb_meta SET value = value + 1 WHERE key = ?", [(key,) for key in keys])
+
 
 class KBStore:
-    def __init__(self, db_path: str, index_path: str):
-        self._db_path = db_path
+    def __init__(self, db_path: str, index_path: str, settings: Settings | None = None):
+        settings = settings or get_settings()
+        self._settings = settings
         self._index_path = index_path
+        self._delta_path = f"{index_path}.delta"
+        self._mmap = settings.kb_index_mmap
+        self._delta_merge_ratio = settings.kb_index_delta_merge_ratio
+        self._ann_kind = settings.kb_index_type
+        self._storage = settings.kb_vector_storage
+        self._rerank_factor = settings.kb_rerank_factor
+        self._promote_threshold = settings.kb_ann_promote_threshold
+        self._promoting = False
+        self._promotion_failed = False
+        self._promoter: threading.Thread | None = None
+        self._compact_records = settings.kb_index_compact_records
+        self._tombstone_compact_ratio = settings.kb_tombstone_compact_ratio
+        self._rebuild_lock = threading.Lock()
+        self._compact_interval_s = settings.kb_index_compact_interval_s
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compact_wakeup = threading.Event()
+        self._closed = threading.Event()
+        self._compactor: threading.Thread | None = None
+        self._chunk_cache: LRUCache[int, tuple[str, str]] = LRUCache(settings.kb_chunk_cache_size)
+        self._sync_lock = threading.Lock()
+        # Highest chunk id absorbed into the in-memory index; every indexable row at or below it is in.
+        self._watermark = 0
+        self._since_snapshot = 0
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = SQLitePool(db_path, settings)
         self._init_db()
-        self._index, self._id_map = self._load_or_create_index()
+        self._seen = self._read_meta()
+        self._index = None
+        self._matrix = None
+        self._tombstones = Tombstones()
+        if faiss:
+            Path(index_path).parent.mkdir(parents=True, exist_ok=True)
+            # Serializes snapshot writes across every worker process sharing these files.
+            self._file_lock = FileLock(f"{index_path}.lock")
+            self._index = self._load_or_create_index()
+        else:
+            self._matrix = self._load_matrix()
 
     def _init_db(self) -> None:
-        conn = sqlite3.connect(self._db_path)
+        with self._db.writer() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chunk_id TEXT NOT NULL UNIQUE,
+                    doc_id TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    metadata TEXT,
+                    embedding BLOB
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(chunks)")}
+            if "embedding" not in columns:
+                conn.execute("ALTER TABLE chunks ADD COLUMN embedding BLOB")
+            if "id" not in columns:
+                self._migrate_surrogate_keys(conn)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_doc_id ON chunks(doc_id)")
+            # Chunk ids deleted from `chunks` whose vectors are still in the persisted index.
+            conn.execute("CREATE TABLE IF NOT EXISTS tombstones (id INTEGER PRIMARY KEY)")
+            conn.execute("CREATE TABLE IF NOT EXISTS kb_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.executemany("INSERT OR IGNORE INTO kb_meta (key, value) VALUES (?, 0)", [(key,) for key in _META_KEYS])
+            self._fts_enabled = self._init_fts(conn)
+        migrated = self._migrate_json_embeddings()
+        if migrated:
+            # Reclaim the space previously held by JSON-encoded floats.
+            with self._db.writer() as conn:
+                conn.execute("VACUUM")
+            logger.info("kb_embeddings_migrated", extra={"rows": migrated})
+
+    @staticmethod
+    def _migrate_surrogate_keys(conn: sqlite3.Connection) -> None:
+        """Rebuild a legacy `chunks` table (TEXT primary key) with a stable integer `id`."""
+        conn.execute("BEGIN")
+        conn.execute("ALTER TABLE chunks RENAME TO chunks_legacy")
         conn.execute(
             """
-            CREATE TABLE IF NOT EXISTS chunks (
-                chunk_id TEXT PRIMARY KEY,
+            CREATE TABLE chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chunk_id TEXT NOT NULL UNIQUE,
                 doc_id TEXT NOT NULL,
                 source TEXT NOT NULL,
                 text TEXT NOT NULL,
-                metadata TEXT
+                metadata TEXT,
+                embedding BLOB
             )
             """
         )
-        conn.commit()
-        conn.close()
-
-    def _load_or_create_index(self) -> tuple[Any | None, list[str]]:
-        if faiss and Path(self._index_path).exists() and Path(f"{self._index_path}.ids").exists():
-            index = faiss.read_index(self._index_path)
-            ids = json.loads(Path(f"{self._index_path}.ids").read_text(encoding="utf-8"))
-            return index, ids
-        return None, []
-
-    def add_chunks(self, source: str, chunks: list[str], embeddings: list[list[float]]) -> tuple[str, int]:
-        doc_id = str(uuid.uuid4())
-        conn = sqlite3.connect(self._db_path)
-        for text, emb in zip(chunks, embeddings):
-            chunk_id = str(uuid.uuid4())
+        conn.execute(
+            "INSERT INTO chunks (chunk_id, doc_id, source, text, metadata, embedding) "
+            "SELECT chunk_id, doc_id, source, text, metadata, embedding FROM chunks_legacy ORDER BY rowid"
+        )
+        conn.execute("DROP TABLE chunks_legacy")
+        logger.info("kb_chunks_surrogate_keys_migrated")
+
+    @staticmethod
+    def _init_fts(conn: sqlite3.Connection) -> bool:
+        """Keep an external-content FTS5 index over `chunks` in sync through triggers.
+
+        Triggers run inside the writing transaction, so a chunk is keyword-searchable
+        exactly when its row is committed.
+        """
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'chunks_fts'").fetchone()
+        try:
             conn.execute(
-                "INSERT INTO chunks (chunk_id, doc_id, source, text, metadata) VALUES (?, ?, ?, ?, ?)",
-                (chunk_id, doc_id, source, text, json.dumps({"dim": len(emb), "embedding": emb})),
+                "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5("
+                "text, source, content='chunks', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            )
+        except sqlite3.OperationalError:
+            logger.warning("kb_fts5_unavailable")
+            return False
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS chunks_fts_ai AFTER INSERT ON chunks BEGIN
+                INSERT INTO chunks_fts (rowid, text, source) VALUES (new.id, new.text, new.source);
+            END
+            """
+        )
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS chunks_fts_ad AFTER DELETE ON chunks BEGIN
+                INSERT INTO chunks_fts (chunks_fts, rowid, text, source) VALUES ('delete', old.id, old.text, old.source);
+            END
+            """
+        )
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS chunks_fts_au AFTER UPDATE OF text, source ON chunks BEGIN
+                INSERT INTO chunks_fts (chunks_fts, rowid, text, source) VALUES ('delete', old.id, old.text, old.source);
+                INSERT INTO chunks_fts (rowid, text, source) VALUES (new.id, new.text, new.source);
+            END
+            """
+        )
+        if not exists:
+            conn.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('rebuild')")
+            logger.info("kb_fts_index_built")
+        return True
+
+    def _migrate_json_embeddings(self) -> int:
+        """Move legacy embeddings out of `metadata` JSON into the `embedding` BLOB column.
+
+        Runs in small committed batches so concurrent readers are never blocked for long.
+        """
+        migrated = 0
+        last_id = 0
+        while True:
+            rows = self._db.reader().execute(
+                "SELECT id, metadata FROM chunks WHERE id > ? AND embedding IS NULL AND metadata IS NOT NULL "
+                "ORDER BY id LIMIT ?",
+                (last_id, _MIGRATION_BATCH),
+            ).fetchall()
+            if not rows:
+                return migrated
+            updates = []
+            for row_id, metadata in rows:
+                last_id = row_id
+                try:
+                    meta = json.loads(metadata)
+                    emb = meta.pop("embedding")
+                except Exception:
+                    continue
+                meta.pop("dim", None)
+                updates.append((pack_vector(emb), json.dumps(meta) if meta else None, row_id))
+            with self._db.writer() as conn:
+                conn.executemany("UPDATE chunks SET embedding = ?, metadata = ? WHERE id = ?", updates)
+            migrated += len(updates)
+
+    def _load_or_create_index(self) -> Any | None:
+        with self._file_lock:
+            self._seen = self._read_meta()
+            for legacy_log in (f"{self._index_path}.wal", f"{self._index_path}.wal.compacting"):
+                # Vector logs from before SQLite catch-up; every vector in them is also in SQLite.
+                Path(legacy_log).unlink(missing_ok=True)
+            legacy_ids = Path(f"{self._index_path}.ids")
+            if legacy_ids.exists():
+                # Positional index from before integer chunk ids; SQLite holds every vector, so rebuild.
+                Path(self._index_path).unlink(missing_ok=True)
+                legacy_ids.unlink()
+            index = self._read_snapshot() if Path(self._index_path).exists() else None
+            if index is None or index_storage(index) not in (self._storage, "pq"):
+                # A snapshot saved under another `kb_vector_storage` is re-encoded from the float32 rows.
+                return self._rebuild_from_db()
+        rows = self._db.reader().execute("SELECT id FROM tombstones").fetchall()
+        self._tombstones = Tombstones(row_id for (row_id,) in rows)
+        self._index = index
+        self._watermark = newest_id(index)
+        caught_up = self._catch_up()
+        if caught_up:
+            logger.info("kb_index_caught_up", extra={"vectors": caught_up})
+        return self._index
+
+    def _read_snapshot(self) -> Any:
+        if not self._mmap:
+            return faiss.read_index(self._index_path)
+        base = map_index(self._index_path)
+        delta = faiss.read_index(self._delta_path) if Path(self._delta_path).exists() else None
+        # A delta left over from before the last full snapshot only holds vectors already in the base.
+        if delta is None or delta.d != base.d or not delta.ntotal or index_ids(delta).min() <= newest_id(base):
+            delta = new_index("flat", base.d, self._settings)
+        return LayeredIndex(base, delta)
+
+    def _read_meta(self) -> dict[str, int]:
+        return dict(self._db.reader().execute("SELECT key, value FROM kb_meta").fetchall())
+
+    def _publish_snapshot(self, conn: sqlite3.Connection) -> None:
+        """Tell other processes the base snapshot was replaced and must be reloaded."""
+        _bump(conn, *_META_KEYS)
+        self._seen["snapshot"] = conn.execute("SELECT value FROM kb_meta WHERE key = 'snapshot'").fetchone()[0]
+
+    def _count_indexable(self, dim: int | None = None) -> int:
+        if dim is None:
+            return self._db.reader().execute("SELECT COUNT(*) FROM chunks WHERE embedding IS NOT NULL").fetchone()[0]
+        return self._db.reader().execute(
+            "SELECT COUNT(*) FROM chunks WHERE length(embedding) = ?",
+            (len(pack_vector(np.zeros(dim, dtype=np.float32))),),
+        ).fetchone()[0]
+
+    def _rebuild_from_db(self) -> Any | None:
+        total = self._count_indexable()
+        kind = self._ann_kind if total >= self._promote_threshold else "flat"
+        index, max_id = self._build_index(kind, total)
+        if index is None:
+            # Nothing to index: publishing would only make every other worker reload its view,
+            # and their tombstones still cover vectors they hold.
+            return None
+        logger.info("kb_index_rebuilt", extra={"vectors": index.ntotal, "index_type": kind})
+        self._index = index
+        self._watermark = max_id
+        self.compact_index()
+        with self._db.writer() as conn:
+            conn.execute("DELETE FROM tombstones")
+            self._publish_snapshot(conn)
+        return self._index
+
+    def _build_index(self, kind: str, total: int) -> tuple[Any | None, int]:
+        """Build a fresh index of `kind` from SQLite; returns it with the highest chunk id it holds."""
+        index = None
+        max_id = 0
+        for ids, vectors in self._iter_db_vectors():
+            if index is None:
+                index = new_index(kind, vectors.shape[1], self._settings, total)
+                sample_size = training_size(kind, self._settings, total)
+                if sample_size:
+                    index.train(self._sample_vectors(sample_size, vectors.shape[1]))
+            faiss.normalize_L2(vectors)
+            index.add_with_ids(vectors, ids)
+            max_id = int(ids[-1])
+        return index, max_id
+
+    def _sample_vectors(self, size: int, dim: int) -> np.ndarray:
+        rows = self._db.reader().execute(
+            "SELECT embedding FROM chunks WHERE embedding IS NOT NULL ORDER BY RANDOM() LIMIT ?", (size,)
+        ).fetchall()
+        sample = np.vstack([vec for (blob,) in rows if (vec := unpack_vector(blob)).shape[0] == dim]).astype(np.float32)
+        faiss.normalize_L2(sample)
+        return sample
+
+    def _maybe_promote(self) -> None:
+        """Start a background rebuild into the configured ANN index once the flat index grows too large."""
+        if self._ann_kind == "flat" or self._promoting or self._promotion_failed:
+            return
+        if index_kind(self._index) != "flat" or self._index.ntotal < self._promote_threshold:
+            return
+        self._promoting = True
+        self._promoter = threading.Thread(target=self._promote, name="kb-index-promote", daemon=True)
+        self._promoter.start()
+
+    def _promote(self) -> None:
+        try:
+            with self._rebuild_lock:
+                base_snapshot = self._seen["snapshot"]
+                dead_before = self._tombstones.ids()
+                index, max_id = self._build_index(self._ann_kind, self._count_indexable(self._index.d))
+                recall = self._measure_recall(index, max_id)
+                if recall < self._settings.kb_ann_min_recall:
+                    logger.warning("kb_index_promotion_rejected", extra={"index_type": self._ann_kind, "recall": recall})
+                    self._promotion_failed = True
+                    return
+                if not self._swap_in(index, max_id, dead_before, base_snapshot):
+                    return
+            logger.info("kb_index_promoted", extra={"index_type": self._ann_kind, "vectors": index.ntotal, "recall": recall})
+        except Exception:
+            logger.exception("kb_index_promotion_failed")
+            self._promotion_failed = True
+        finally:
+            self._promoting = False
+
+    def _swap_in(self, index: Any, max_id: int, dead_before: np.ndarray, base_snapshot: int) -> bool:
+        """Replace the live index with one rebuilt from SQLite, then persist and publish it.
+
+        Rows deleted before the rebuild started are absent from the new index, so their
+        tombstones are dropped; anything deleted during the rebuild stays tombstoned.
+        Returns False, discarding `index`, if another process published a snapshot
+        after `base_snapshot`; the next sync loads that one instead.
+        """
+        with self._file_lock:
+            if self._read_meta()["snapshot"] != base_snapshot:
+                logger.info("kb_index_swap_superseded")
+                return False
+            with self._lock:
+                # Chunks committed while the new index was building.
+                self._watermark = self._fill(index, max_id)
+                self._index = index
+                self._tombstones.discard(dead_before)
+            self.compact_index()
+            # Only forget persisted tombstones once the snapshot without those vectors is on disk.
+            with self._db.writer() as conn:
+                conn.executemany("DELETE FROM tombstones WHERE id = ?", [(int(i),) for i in dead_before])
+                self._publish_snapshot(conn)
+        return True
+
+    def _fill(self, index: Any, after_id: int) -> int:
+        """Add rows newer than `after_id` from SQLite to `index`; returns the last id added."""
+        for ids, vectors in self._iter_db_vectors(after_id=after_id, dim=index.d):
+            faiss.normalize_L2(vectors)
+            index.add_with_ids(vectors, ids)
+            after_id = int(ids[-1])
+        return after_id
+
+    def _delta_oversized(self) -> bool:
+        index = self._index
+        if not isinstance(index, LayeredIndex):
+            return False
+        return index.delta.ntotal >= max(self._compact_records, self._delta_merge_ratio * index.base.ntotal)
+
+    def merge_delta(self) -> None:
+        """Fold the in-memory delta into a new full snapshot and map it in place of the old base.
+
+        Only this process holds a private copy of the base while the merge runs; the
+        delta is capped at `kb_index_delta_merge_ratio` of the base, so merges are rare.
+        """
+        self.sync()
+        with self._rebuild_lock:
+            if not isinstance(self._index, LayeredIndex):
+                return
+            base_snapshot = self._seen["snapshot"]
+            merged = faiss.read_index(self._index_path)
+            base_newest = newest_id(merged)
+            tombstoned = self._tombstones.ids()
+            # Rows tombstoned past the base were deleted before this read, so they never reach `merged`.
+            dead_before = tombstoned[tombstoned > base_newest]
+            max_id = self._fill(merged, base_newest)
+            if not self._swap_in(merged, max_id, dead_before, base_snapshot):
+                return
+        logger.info("kb_index_delta_merged", extra={"vectors": merged.ntotal})
+
+    def dead_ratio(self) -> float:
+        if not faiss:
+            return self._matrix.dead / len(self._matrix) if len(self._matrix) else 0.0
+        if self._index is None or not self._index.ntotal:
+            return 0.0
+        return len(self._tombstones) / self._index.ntotal
+
+    def purge_tombstones(self) -> None:
+        """Rebuild without dead vectors and VACUUM the database to hand the freed pages back."""
+        purged: list[int] = []
+        if not faiss:
+            with self._lock:
+                # Persisted tombstones, including any another process wrote since our last sync.
+                purged = [row_id for (row_id,) in self._db.reader().execute("SELECT id FROM tombstones")]
+                self._matrix.tombstone(purged)
+                dead = self._matrix.dead
+                self._matrix = self._matrix.compacted()
+        else:
+            self.sync()
+            with self._rebuild_lock:
+                dead = len(self._tombstones)
+                if self._index is None or not dead:
+                    return
+                base_snapshot = self._seen["snapshot"]
+                dead_before = self._tombstones.ids()
+                kind = index_kind(self._index)
+                index, max_id = self._build_index(kind, self._count_indexable(self._index.d))
+                if index is None:
+                    index = new_index("flat", self._index.d, self._settings)
+                if not self._swap_in(index, max_id, dead_before, base_snapshot):
+                    return
+        with self._db.writer() as conn:
+            # The FAISS path already dropped its tombstones in `_swap_in`. VACUUM cannot run
+            # inside a transaction, so the delete is committed first under the same writer lock.
+            if purged:
+                conn.executemany("DELETE FROM tombstones WHERE id = ?", [(i,) for i in purged])
+                conn.commit()
+            conn.execute("VACUUM")
+        logger.info("kb_tombstones_purged", extra={"dead": dead})
+
+    def _measure_recall(self, index: Any, max_id: int, k: int = 10) -> float:
+        """Recall@k of `index` against an exact scan over the same vectors, using stored chunks as queries."""
+        queries = self._sample_vectors(self._settings.kb_ann_recall_queries, index.d)
+        batches = ((ids[ids <= max_id], vectors[ids <= max_id]) for ids, vectors in self._iter_db_vectors(dim=index.d))
+        exact = exact_search(batches, queries, k)
+        _, approx = index.search(queries, k, params=search_params(index, self._settings))
+        return recall_at_k(approx, exact)
+
+    def _load_matrix(self) -> VectorMatrix:
+        matrix = VectorMatrix(storage=self._storage)
+        for ids, vectors in self._iter_db_vectors():
+            matrix.append(ids, vectors)
+            self._watermark = int(ids[-1])
+        return matrix
+
+    def _iter_db_vectors(self, after_id: int = 0, dim: int | None = None) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """Yield (ids, vectors) batches in id order; rows whose dim differs from the first row are skipped."""
+        cursor = self._db.reader().execute(
+            "SELECT id, embedding FROM chunks WHERE id > ? AND embedding IS NOT NULL ORDER BY id", (after_id,)
+        )
+        while rows := cursor.fetchmany(_LOAD_BATCH):
+            decoded = [(row_id, unpack_vector(blob)) for row_id, blob in rows]
+            dim = dim or decoded[0][1].shape[0]
+            kept = [(row_id, vec) for row_id, vec in decoded if vec.shape[0] == dim]
+            if not kept:
+                continue
+            yield (
+                np.array([row_id for row_id, _ in kept], dtype=np.int64),
+                np.vstack([vec for _, vec in kept]).astype(np.float32, copy=False),
             )
-            self._id_map.append(chunk_id)
-            vec = np.array([emb], dtype=np.float32)
+
+    def add_chunks(
+        self,
+        source: str,
+        chunks: list[str],
+        embeddings: list[list[float]],
+        doc_id: str | None = None,
+        index: bool = True,
+    ) -> tuple[str, int]:
+        """Store chunks under `doc_id` (a new one if omitted); repeated calls append batches to one document.
+
+        With `index=False` the rows are only committed; bulk loads call `rebuild_index` once at the end.
+        """
+        doc_id = doc_id or str(uuid.uuid4())
+        rows = [(str(uuid.uuid4()), doc_id, source, text, pack_vector(emb)) for text, emb in zip(chunks, embeddings)]
+        # Commit and index under one lock so an index rebuild never sees a committed-but-unindexed chunk.
+        with self._lock:
+            with self._db.writer() as conn:
+                conn.executemany(
+                    "INSERT INTO chunks (chunk_id, doc_id, source, text, embedding) VALUES (?, ?, ?, ?, ?)", rows
+                )
+                if rows:
+                    _bump(conn, "generation")
+            if rows and index:
+                dim, index_dim = len(embeddings[0]), self._index_dim()
+                if index_dim not in (None, dim):
+                    logger.warning("kb_embedding_dim_mismatch", extra={"dim": dim, "index_dim": index_dim})
+                # Absorb through SQLite so rows other workers committed before ours are indexed first.
+                self._catch_up()
+                if faiss and self._index is not None:
+                    self._maybe_promote()
+                    self._ensure_compactor()
+                    if self._since_snapshot >= self._compact_records or self._delta_oversized():
+                        self._compact_wakeup.set()
+        return doc_id, len(rows)
+
+    def rebuild_index(self) -> None:
+        """Build the index from SQLite in one pass, as if freshly loaded, and publish it to other workers.
+
+        The configured ANN type is used once the table passes `kb_ann_promote_threshold`,
+        unless its recall falls short, in which case the index stays flat.
+        """
+        if not faiss:
+            with self._lock:
+                self._matrix = self._load_matrix()
+            return
+        with self._rebuild_lock:
+            with self._lock:
+                # Every row goes into the new index, so the old one is not caught up first: that
+                # would index bulk-loaded rows twice. Moving the watermark keeps `sync` from doing it.
+                self._seen = self._read_meta()
+                self._watermark = self._db.reader().execute("SELECT COALESCE(MAX(id), 0) FROM chunks").fetchone()[0]
+            base_snapshot = self._seen["snapshot"]
+            rows = self._db.reader().execute("SELECT id FROM tombstones").fetchall()
+            dead_before = np.array([row_id for (row_id,) in rows], dtype=np.int64)
+            total = self._count_indexable()
+            kind = self._ann_kind if total >= self._promote_threshold else "flat"
+            index, max_id = self._build_index(kind, total)
+            recall = self._measure_recall(index, max_id) if index is not None and kind != "flat" else 1.0
+            if recall < self._settings.kb_ann_min_recall:
+                logger.warning("kb_index_promotion_rejected", extra={"index_type": kind, "recall": recall})
+                kind = "flat"
+                index, max_id = self._build_index(kind, total)
+            if index is None or not self._swap_in(index, max_id, dead_before, base_snapshot):
+                return
+        logger.info("kb_index_rebuilt", extra={"vectors": index.ntotal, "index_type": kind})
+
+    def delete_document(self, doc_id: str) -> int:
+        """Delete a document's chunks and tombstone their vectors so searches skip them immediately.
+
+        The vectors themselves are dropped by `purge_tombstones`, which the background
+        compactor runs once the dead ratio passes `kb_tombstone_compact_ratio`.
+        """
+        with self._lock:
+            ids = self._chunk_ids_for_docs([doc_id])
+            if not len(ids):
+                return 0
+            with self._db.writer() as conn:
+                conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+                conn.executemany("INSERT OR IGNORE INTO tombstones (id) VALUES (?)", [(int(i),) for i in ids])
+                _bump(conn, "generation", "deletes")
+            for row_id in ids:
+                self._chunk_cache.pop(int(row_id))
             if faiss:
-                if self._index is None:
-                    self._index = faiss.IndexFlatIP(vec.shape[1])
-                faiss.normalize_L2(vec)
-                self._index.add(vec)
-        conn.commit()
-        conn.close()
+                self._tombstones.add(ids)
+            else:
+                self._matrix.tombstone(ids)
+            if self.dead_ratio() >= self._tombstone_compact_ratio:
+                self._ensure_compactor()
+                self._compact_wakeup.set()
+        return len(ids)
+
+    @property
+    def generation(self) -> int:
+        """Write counter shared by every process on this database; syncs first, so derived caches can key on it."""
+        self.sync()
+        return self._seen["generation"]
+
+    def sync(self) -> None:
+        """Pick up writes that other worker processes made to the shared database.
+
+        Costs one small `kb_meta` read when nothing changed. Otherwise rows past the
+        watermark are absorbed, a snapshot another process published (purge, promotion,
+        merge) is reloaded, and tombstones are re-read. Queries keep using the current
+        view meanwhile, and only one thread per process syncs at a time.
+        """
+        meta = self._read_meta()
+        if meta["generation"] == self._seen["generation"] or not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            if faiss and meta["snapshot"] != self._seen["snapshot"] and Path(self._index_path).exists():
+                self._reload_view()
+            else:
+                self._catch_up()
+            if meta["deletes"] != self._seen["deletes"]:
+                self._reload_tombstones()
+            self._seen = meta
+        finally:
+            self._sync_lock.release()
+
+    def _catch_up(self) -> int:
+        """Absorb rows committed past the watermark, by any process, into the index in id order.
+
+        The lock is held per batch, so queries interleave with a long catch-up.
+        """
+        absorbed = 0
+        while True:
+            with self._lock:
+                batch = next(self._iter_db_vectors(after_id=self._watermark, dim=self._index_dim()), None)
+                if batch is None:
+                    return absorbed
+                ids, vectors = batch
+                if not faiss:
+                    self._matrix.append(ids, vectors)
+                else:
+                    if self._index is None:
+                        self._index = new_index("flat", vectors.shape[1], self._settings)
+                    faiss.normalize_L2(vectors)
+                    self._index.add_with_ids(vectors, ids)
+                    self._since_snapshot += len(ids)
+                self._watermark = int(ids[-1])
+                absorbed += len(ids)
+
+    def _reload_view(self) -> None:
+        """Swap in the snapshot on disk plus every newer row; queries keep the old view until the swap."""
+        index = self._read_snapshot()
+        last_id = self._fill(index, newest_id(index))
+        with self._lock:
+            self._watermark = self._fill(index, last_id)
+            self._index = index
+
+    def _reload_tombstones(self) -> None:
+        with self._lock:
+            ids = [row_id for (row_id,) in self._db.reader().execute("SELECT id FROM tombstones")]
+            if faiss:
+                self._tombstones = Tombstones(ids)
+            else:
+                self._matrix.tombstone(ids)
+
+    def _index_dim(self) -> int | None:
+        if not faiss:
+            return self._matrix.dim
+        return self._index.d if self._index is not None else None
+
+    def doc_ids_for_source(self, source: str) -> list[str]:
+        rows = self._db.reader().execute("SELECT DISTINCT doc_id FROM chunks WHERE source = ?", (source,)).fetchall()
+        return [doc_id for (doc_id,) in rows]
+
+    def stats(self) -> dict[str, Any]:
+        self.sync()
+        reader = self._db.reader()
+        documents, live = reader.execute("SELECT COUNT(DISTINCT doc_id), COUNT(*) FROM chunks").fetchone()
+        page_size = reader.execute("PRAGMA page_size").fetchone()[0]
+        pages = reader.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = reader.execute("PRAGMA freelist_count").fetchone()[0]
         if faiss:
-            self._persist_index()
-        return doc_id, len(chunks)
+            index_vectors = self._index.ntotal if self._index is not None else 0
+            dead = len(self._tombstones)
+        else:
+            index_vectors, dead = len(self._matrix), self._matrix.dead
+        return {
+            "documents": documents,
+            "live_chunks": live,
+            "index_vectors": index_vectors,
+            "dead_vectors": dead,
+            "dead_ratio": self.dead_ratio(),
+            "index_type": self.index_type,
+            "vector_storage": self._storage,
+            "db_bytes": pages * page_size,
+            "db_free_bytes": free_pages * page_size,
+        }
+
+    def memory_bytes(self) -> int:
+        """Approximate resident size of this store's vector index."""
+        if not faiss:
+            return self._matrix.nbytes
+        with self._lock:
+            return index_bytes(self._index) if self._index is not None else 0
+
+    @property
+    def index_type(self) -> str:
+        if not faiss:
+            return "numpy"
+        return index_kind(self._index) if self._index is not None else "flat"
 
-    def search(self, query_vec: list[float], top_k: int) -> list[dict[str, Any]]:
+    def search(
+        self,
+        query_vec: list[float],
+        top_k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        doc_ids: list[str] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Rank chunks by cosine similarity; `doc_ids` restricts the search to those documents."""
+        scores, ids = self.rank(query_vec, top_k, nprobe=nprobe, ef_search=ef_search, doc_ids=doc_ids)
+        return self.hydrate(scores, ids)
+
+    def rank(
+        self,
+        query_vec: list[float],
+        top_k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        doc_ids: list[str] | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Like `search`, but returns (scores, chunk ids) without loading chunk rows."""
+        self.sync()
+        allowed = self._chunk_ids_for_docs(doc_ids) if doc_ids is not None else None
+        if allowed is not None and not len(allowed):
+            return _EMPTY_RANKING
         if faiss:
-            return self._search_with_faiss(query_vec, top_k)
-        return self._search_with_numpy(query_vec, top_k)
+            return self._rank_with_faiss(query_vec, top_k, nprobe=nprobe, ef_search=ef_search, allowed=allowed)
+        q = np.array(query_vec, dtype=np.float32)
+        fetch = self._candidate_count(top_k)
+        scores, ids = self._matrix.search(q, fetch, allowed=allowed)
+        if fetch == top_k:
+            return scores, ids
+        scores, ids = self._rerank(q[None, :], ids[None, :], top_k)
+        keep = ids[0] >= 0
+        return scores[0][keep], ids[0][keep]
+
+    def search_batch(
+        self,
+        query_vecs: list[list[float]],
+        top_k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """Search many queries with one index scan and one chunk lookup; results are per query, in order."""
+        scores, ids = self.rank_batch(query_vecs, top_k, nprobe=nprobe, ef_search=ef_search)
+        rows = self._load_rows(ids.ravel())
+        return [self._matches(rows, row_scores, row_ids) for row_scores, row_ids in zip(scores, ids)]
+
+    def rank_batch(
+        self,
+        query_vecs: list[list[float]],
+        top_k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """(n x k) scores and chunk ids for an (n x dim) query matrix; missing slots hold id -1."""
+        self.sync()
+        q = np.array(query_vecs, dtype=np.float32).reshape(len(query_vecs), -1)
+        fetch = self._candidate_count(top_k)
+        if not faiss:
+            scores, ids = self._matrix.search_batch(q, fetch)
+        else:
+            with self._lock:
+                if self._index is None or self._index.ntotal == 0 or q.shape[1] != self._index.d:
+                    return np.empty((len(q), 0), dtype=np.float32), np.empty((len(q), 0), dtype=np.int64)
+                faiss.normalize_L2(q)
+                params = search_params(
+                    self._index, self._settings, nprobe=nprobe, ef_search=ef_search, sel=self._tombstones.selector()
+                )
+                scores, ids = self._index.search(q, fetch, params=params)
+        return self._rerank(q, ids, top_k) if fetch > top_k else (scores, ids)
+
+    def rank_keywords(self, query: str, top_k: int, doc_ids: list[str] | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """BM25 ranking over chunk text and source via FTS5; scores are negated so higher is better."""
+        match = fts_query(query)
+        if not self._fts_enabled or not match or doc_ids == []:
+            return _EMPTY_RANKING
+        sql = "SELECT rowid, bm25(chunks_fts) FROM chunks_fts WHERE chunks_fts MATCH ?"
+        params: list[Any] = [match]
+        if doc_ids is not None:
+            sql += f" AND rowid IN (SELECT id FROM chunks WHERE doc_id IN ({','.join('?' for _ in doc_ids)}))"
+            params.extend(doc_ids)
+        rows = self._db.reader().execute(sql + " ORDER BY rank LIMIT ?", (*params, top_k)).fetchall()
+        return (
+            np.array([-score for _, score in rows], dtype=np.float32),
+            np.array([row_id for row_id, _ in rows], dtype=np.int64),
+        )
 
-    def _search_with_faiss(self, query_vec: list[float], top_k: int) -> list[dict[str, Any]]:
+    def _chunk_ids_for_docs(self, doc_ids: list[str]) -> np.ndarray:
+        if not doc_ids:
+            return np.empty(0, dtype=np.int64)
+        placeholders = ",".join("?" for _ in doc_ids)
+        rows = self._db.reader().execute(f"SELECT id FROM chunks WHERE doc_id IN ({placeholders})", doc_ids).fetchall()
+        return np.array([row_id for (row_id,) in rows], dtype=np.int64)
+
+    def _rank_with_faiss(
+        self,
+        query_vec: list[float],
+        top_k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        allowed: np.ndarray | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
         if self._index is None or self._index.ntotal == 0:
-            return []
+            return _EMPTY_RANKING
         q = np.array([query_vec], dtype=np.float32)
         faiss.normalize_L2(q)
-        scores, idxs = self._index.search(q, top_k)
-        conn = sqlite3.connect(self._db_path)
-        matches: list[dict[str, Any]] = []
-        for score, idx in zip(scores[0], idxs[0]):
-            if idx < 0 or idx >= len(self._id_map):
+        if allowed is not None and index_kind(self._index) == "hnsw":
+            # Graph traversal degrades under a narrow selector; score the few candidates exactly.
+            scores, ids = self._rerank(q, allowed[None, :], top_k)
+            return scores[0], ids[0]
+        fetch = self._candidate_count(top_k)
+        with self._lock:
+            # `allowed` comes from live SQLite rows, so only the unfiltered search needs the tombstones.
+            sel = faiss.IDSelectorBatch(allowed) if allowed is not None else self._tombstones.selector()
+            params = search_params(self._index, self._settings, nprobe=nprobe, ef_search=ef_search, sel=sel)
+            scores, ids = self._index.search(q, fetch, params=params)
+        if fetch > top_k:
+            scores, ids = self._rerank(q, ids, top_k)
+        return scores[0], ids[0]
+
+    def _candidate_count(self, top_k: int) -> int:
+        """How many approximate candidates to pull so a float32 rerank can restore the exact top-k."""
+        lossy = self._storage != "float32"
+        if faiss and self._index is not None:
+            lossy = lossy or index_kind(self._index) == "ivf_pq"
+        return top_k * self._rerank_factor if lossy and self._rerank_factor > 1 else top_k
+
+    def _rerank(self, queries: np.ndarray, candidates: np.ndarray, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Rescore each query's candidate ids against the exact float32 vectors in SQLite.
+
+        Returns (n x k) scores and ids, best first, with id -1 in unfilled slots.
+        """
+        q = normalize_rows(queries)
+        vectors = self._exact_vectors(candidates.ravel(), q.shape[1])
+        k = min(top_k, candidates.shape[1])
+        out_scores = np.full((len(q), k), -np.inf, dtype=np.float32)
+        out_ids = np.full((len(q), k), -1, dtype=np.int64)
+        for row, (query, ids) in enumerate(zip(q, candidates)):
+            kept = [int(i) for i in ids if int(i) in vectors]
+            if not kept:
+                continue
+            scores = np.vstack([vectors[i] for i in kept]) @ query
+            order = np.argsort(-scores, kind="stable")[:k]
+            out_scores[row, : len(order)] = scores[order]
+            out_ids[row, : len(order)] = np.array(kept, dtype=np.int64)[order]
+        return out_scores, out_ids
+
+    def _exact_vectors(self, ids: np.ndarray, dim: int) -> dict[int, np.ndarray]:
+        wanted = [i for i in dict.fromkeys(int(i) for i in ids) if i >= 0]
+        if not wanted:
+            return {}
+        placeholders = ",".join("?" for _ in wanted)
+        rows = self._db.reader().execute(
+            f"SELECT id, embedding FROM chunks WHERE id IN ({placeholders}) AND embedding IS NOT NULL", wanted
+        ).fetchall()
+        # Deleted rows are simply absent, and rows of another dim were never indexed.
+        decoded = [(row_id, vec) for row_id, blob in rows if (vec := unpack_vector(blob)).shape[0] == dim]
+        if not decoded:
+            return {}
+        vectors = normalize_rows(np.vstack([vec for _, vec in decoded]).astype(np.float32, copy=False))
+        return {row_id: vec for (row_id, _), vec in zip(decoded, vectors)}
+
+    def hydrate(self, scores: np.ndarray, ids: np.ndarray) -> list[dict[str, Any]]:
+        """Resolve ranked ids to chunk rows with one set-based query, preserving score order."""
+        return self._matches(self._load_rows(ids), scores, ids)
+
+    def _load_rows(self, ids: np.ndarray) -> dict[int, tuple[str, str]]:
+        found: dict[int, tuple[str, str]] = {}
+        missing: list[int] = []
+        for row_id in dict.fromkeys(int(i) for i in ids):
+            if row_id < 0:
                 continue
-            chunk_id = self._id_map[idx]
-            row = conn.execute("SELECT source, text FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()
-            if not row:
+            cached = self._chunk_cache.get(row_id)
+            if cached is None:
+                missing.append(row_id)
+            else:
+                found[row_id] = cached
+        if missing:
+            placeholders = ",".join("?" for _ in missing)
+            rows = self._db.reader().execute(
+                f"SELECT id, source, text FROM chunks WHERE id IN ({placeholders})", missing
+            ).fetchall()
+            for row_id, source, text in rows:
+                found[row_id] = (source, text)
+                self._chunk_cache.put(row_id, (source, text))
+        return found
+
+    @staticmethod
+    def _matches(found: dict[int, tuple[str, str]], scores: np.ndarray, ids: np.ndarray) -> list[dict[str, Any]]:
+        matches: list[dict[str, Any]] = []
+        for score, row_id in zip(scores, ids):
+            row = found.get(int(row_id))
+            if row is None:
                 continue
             matches.append({"source": row[0], "text": row[1], "score": float(score)})
-        conn.close()
         return matches
 
-    def _search_with_numpy(self, query_vec: list[float], top_k: int) -> list[dict[str, Any]]:
-        conn = sqlite3.connect(self._db_path)
-        rows = conn.execute("SELECT source, text, metadata FROM chunks").fetchall()
-        conn.close()
-        if not rows:
-            return []
-        q = np.array(query_vec, dtype=np.float32)
-        q_norm = np.linalg.norm(q) or 1.0
-        scored = []
-        for source, text, metadata in rows:
-            try:
-                emb = np.array(json.loads(metadata).get("embedding", []), dtype=np.float32)
-                score = float(np.dot(q, emb) / (q_norm * (np.linalg.norm(emb) or 1.0)))
-            except Exception:
-                score = 0.0
-            scored.append({"source": source, "text": text, "score": score})
-        scored.sort(key=lambda x: x["score"], reverse=True)
-        return scored[:top_k]
-
     def fetch_context_by_doc_ids(self, doc_ids: list[str], limit: int = 8) -> list[str]:
         if not doc_ids:
             return []
-        conn = sqlite3.connect(self._db_path)
         placeholders = ",".join("?" for _ in doc_ids)
-        rows = conn.execute(
+        rows = self._db.reader().execute(
             f"SELECT text FROM chunks WHERE doc_id IN ({placeholders}) LIMIT ?",
             (*doc_ids, limit),
         ).fetchall()
-        conn.close()
         return [r[0] for r in rows]
 
-    def _persist_index(self) -> None:
-        if not faiss or self._index is None:
+    def close(self) -> None:
+        self._closed.set()
+        self._compact_wakeup.set()
+        if self._compactor is not None:
+            self._compactor.join()
+        if self._promoter is not None:
+            self._promoter.join()
+        if self._since_snapshot:
+            self.compact_index()
+        self._db.close()
+
+    def _ensure_compactor(self) -> None:
+        if self._compactor is None:
+            self._compactor = threading.Thread(target=self._compact_loop, name="kb-index-compactor", daemon=True)
+            self._compactor.start()
+
+    def _compact_loop(self) -> None:
+        last_compaction = time.monotonic()
+        while not self._closed.is_set():
+            triggered = self._compact_wakeup.wait(timeout=self._compact_interval_s)
+            self._compact_wakeup.clear()
+            if self._closed.is_set():
+                return
+            due = triggered or time.monotonic() - last_compaction >= self._compact_interval_s
+            try:
+                if self.dead_ratio() >= self._tombstone_compact_ratio:
+                    self.purge_tombstones()
+                    last_compaction = time.monotonic()
+                elif self._delta_oversized():
+                    self.merge_delta()
+                    last_compaction = time.monotonic()
+                elif due and self._since_snapshot:
+                    self.compact_index()
+                    last_compaction = time.monotonic()
+            except Exception:
+                logger.exception("kb_index_compaction_failed")
+                last_compaction = time.monotonic()
+
+    def compact_index(self) -> None:
+        """Persist vectors absorbed since the last snapshot.
+
+        A layered index only rewrites its small delta file; a freshly built index is
+        written in full and, with `kb_index_mmap`, mapped back in as the new base.
+        Writes hold the cross-process file lock and are skipped while this process has
+        not yet loaded a snapshot another worker published, since they would undo it.
+        """
+        if not faiss:
             return
-        faiss.write_index(self._index, self._index_path)
-        Path(f"{self._index_path}.ids").write_text(json.dumps(self._id_map), encoding="utf-8")
+        with self._compact_lock, self._file_lock:
+            with self._lock:
+                if self._index is None or self._read_meta()["snapshot"] != self._seen["snapshot"]:
+                    return
+                layered = isinstance(self._index, LayeredIndex)
+                snapshot = faiss.serialize_index(self._index.delta if layered else self._index)
+                self._since_snapshot = 0
+            path = self._delta_path if layered else self._index_path
+            snapshot.tofile(f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+            if not layered:
+                Path(self._delta_path).unlink(missing_ok=True)
+                if self._mmap:
+                    self._reload_view()
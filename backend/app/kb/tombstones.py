@@ -0,0 +1,70 @@
+from typing import Any, Iterable
+
+import numpy as np
+
+try:
+    import faiss  # type: ignore
+except Exception:  # pragma: no cover
+    faiss = None
+
+
+class Tombstones:
+    """Bitmap of chunk ids whose vectors are still in the index but whose rows were deleted.
+
+    Chunk ids are dense autoincrement integers, so one bit per id stays small, and the
+    packed bytes plug straight into a FAISS `IDSelectorBitmap` for search-time filtering.
+    """
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._bits = np.zeros(0, dtype=np.uint8)
+        self._count = 0
+        self._selector: Any = None
+        self.add(ids)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, ids: Iterable[int]) -> None:
+        ids = np.unique(np.fromiter(ids, dtype=np.int64))
+        if not len(ids):
+            return
+        needed = int(ids[-1]) // 8 + 1
+        if needed > len(self._bits):
+            grown = np.zeros(max(needed, len(self._bits) * 2), dtype=np.uint8)
+            grown[: len(self._bits)] = self._bits
+            self._bits = grown
+        fresh = ids[~self.contains(ids)]
+        np.bitwise_or.at(self._bits, fresh >> 3, (1 << (fresh & 7)).astype(np.uint8))
+        self._count += len(fresh)
+        self._selector = None
+
+    def discard(self, ids: Iterable[int]) -> None:
+        ids = np.unique(np.fromiter(ids, dtype=np.int64))
+        present = ids[self.contains(ids)]
+        if not len(present):
+            return
+        np.bitwise_and.at(self._bits, present >> 3, (~(1 << (present & 7))).astype(np.uint8))
+        self._count -= len(present)
+        self._selector = None
+
+    def contains(self, ids: np.ndarray) -> np.ndarray:
+        ids = np.asarray(ids, dtype=np.int64)
+        inside = (ids >= 0) & ((ids >> 3) < len(self._bits))
+        mask = np.zeros(len(ids), dtype=bool)
+        byte_idx = ids[inside] >> 3
+        mask[inside] = (self._bits[byte_idx] >> (ids[inside] & 7)) & 1 == 1
+        return mask
+
+    def ids(self) -> np.ndarray:
+        return np.flatnonzero(np.unpackbits(self._bits, bitorder="little")).astype(np.int64)
+
+    def selector(self) -> Any:
+        """FAISS selector matching every id that is *not* tombstoned; None when there is nothing to skip."""
+        if not self._count:
+            return None
+        if self._selector is None:
+            # FAISS keeps a raw pointer into the bitmap, so pin this exact array alongside the selector.
+            bits = self._bits.copy()
+            inner = faiss.IDSelectorBitmap(len(bits), faiss.swig_ptr(bits))
+            self._selector = (faiss.IDSelectorNot(inner), inner, bits)
+        return self._selector[0]
@@ -0,0 +1,30 @@
+import struct
+from typing import Sequence
+
+import numpy as np
+
+# Fixed 8-byte header in front of every stored vector: dtype code, format version, padding, dim.
+# Keeping it 8 bytes wide leaves the payload aligned for np.frombuffer.
+_HEADER = struct.Struct("<cB2xI")
+_FORMAT_VERSION = 1
+_DTYPES: dict[bytes, np.dtype] = {
+    b"f": np.dtype("<f4"),
+    b"e": np.dtype("<f2"),
+}
+_CODES = {dtype: code for code, dtype in _DTYPES.items()}
+
+
+def pack_vector(vec: Sequence[float] | np.ndarray, dtype: str = "<f4") -> bytes:
+    target = np.dtype(dtype)
+    if target not in _CODES:
+        raise ValueError(f"Unsupported vector dtype: {dtype}")
+    arr = np.ascontiguousarray(vec, dtype=target).reshape(-1)
+    return _HEADER.pack(_CODES[target], _FORMAT_VERSION, arr.shape[0]) + arr.tobytes()
+
+
+def unpack_vector(blob: bytes | memoryview) -> np.ndarray:
+    """Return a read-only view over the stored vector; no copy is made."""
+    code, version, dim = _HEADER.unpack_from(blob)
+    if version != _FORMAT_VERSION or code not in _DTYPES:
+        raise ValueError(f"Unsupported vector blob (code={code!r}, version={version})")
+    return np.frombuffer(blob, dtype=_DTYPES[code], count=dim, offset=_HEADER.size)
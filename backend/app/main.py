@@ -1,3 +1,5 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -6,13 +8,24 @@ from app.api.routes.kb import router as kb_router
 from app.api.routes.playbook import router as playbook_router
 from app.api.routes.simulate import router as simulate_router
 from app.api.routes.voice import router as voice_router
+from app.core.blocking import run_blocking
 from app.core.config import get_settings
 from app.core.errors import register_error_handlers
 from app.core.logging import RequestIdMiddleware, configure_logging
+from app.providers.bedrock_client import warm_up
 
 configure_logging()
 settings = get_settings()
-app = FastAPI(title="Multiverse Copilot API", version="0.1.0")
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    if settings.bedrock_warmup and not settings.use_mock_providers:
+        await run_blocking(warm_up, settings)
+    yield
+
+
+app = FastAPI(title="Multiverse Copilot API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(RequestIdMiddleware)
 app.add_middleware(
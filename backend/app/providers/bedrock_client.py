@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError, NoCredentialsError
+
+from app.core.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+_clients: dict[tuple, tuple[boto3.Session, Any]] = {}
+_clients_lock = threading.Lock()
+
+
+def bedrock_runtime(settings: Settings | None = None) -> Any:
+    """The process-wide `bedrock-runtime` client, shared by every Bedrock provider.
+
+    botocore clients are thread-safe, so one client (and one connection pool of
+    `bedrock_max_pool_connections` keep-alive connections) serves all providers. Retries
+    are left to the providers, which know which errors are worth another attempt.
+    """
+    return _session_and_client(settings or get_settings())[1]
+
+
+def _session_and_client(settings: Settings) -> tuple[boto3.Session, Any]:
+    key = (
+        settings.aws_region,
+        settings.aws_profile,
+        settings.bedrock_endpoint_url,
+        settings.bedrock_max_pool_connections,
+        settings.bedrock_connect_timeout_s,
+        settings.bedrock_read_timeout_s,
+        settings.bedrock_tcp_keepalive,
+    )
+    with _clients_lock:
+        pair = _clients.get(key)
+        if pair is None:
+            pair = _clients[key] = _build_client(settings)
+        return pair
+
+
+def _build_client(settings: Settings) -> tuple[boto3.Session, Any]:
+    session_kwargs: dict[str, Any] = {"region_name": settings.aws_region}
+    if settings.aws_profile:
+        session_kwargs["profile_name"] = settings.aws_profile
+    config = Config(
+        max_pool_connections=settings.bedrock_max_pool_connections,
+        connect_timeout=settings.bedrock_connect_timeout_s,
+        read_timeout=settings.bedrock_read_timeout_s,
+        tcp_keepalive=settings.bedrock_tcp_keepalive,
+        retries={"total_max_attempts": 1, "mode": "standard"},
+    )
+    session = boto3.Session(**session_kwargs)
+    client = session.client("bedrock-runtime", config=config, endpoint_url=settings.bedrock_endpoint_url or None)
+    return session, client
+
+
+def warm_up(settings: Settings | None = None) -> None:
+    """Resolve credentials and open `bedrock_warmup_connections` pooled connections before the first real request.
+
+    Each connection is opened by a concurrent `ListAsyncInvokes` call, a cheap read that
+    needs no model access; any API error still leaves the TLS connection in the pool.
+    A failure here is logged and never stops startup: the first request simply pays the cost.
+    """
+    settings = settings or get_settings()
+    connections = settings.bedrock_warmup_connections
+    started = time.perf_counter()
+
+    def touch(_: int) -> None:
+        try:
+            client.list_async_invokes(maxResults=1)
+        except ClientError:
+            pass
+
+    try:
+        session, client = _session_and_client(settings)
+        credentials = session.get_credentials()
+        if credentials is None:
+            raise NoCredentialsError()
+        credentials.get_frozen_credentials()
+        with ThreadPoolExecutor(max_workers=connections, thread_name_prefix="bedrock-warmup") as pool:
+            list(pool.map(touch, range(connections)))
+    except Exception:
+        logger.warning("bedrock_warmup_failed", exc_info=True)
+        return
+    logger.info(
+        "bedrock_warmed_up",
+        extra={"connections": connections, "elapsed_ms": int((time.perf_counter() - started) * 1000)},
+    )
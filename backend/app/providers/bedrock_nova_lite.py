@@ -1,14 +1,14 @@
 import json
 import logging
-import random
 import time
 from typing import Any
 
-import boto3
-from botocore.config import Config
 from botocore.exceptions import ClientError
 
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
+from app.core.hedging import Hedger
+from app.core.retry import RetryPolicy
+from app.providers.bedrock_client import bedrock_runtime
 from app.providers.interfaces import LLMProvider, LLMResponse
 from app.schemas import AuditMeta, SimulationResult
 from app.sim.prompt_builder import PromptBuilder
@@ -17,59 +17,72 @@ logger = logging.getLogger(__name__)
 
 
 class NovaLiteClient(LLMProvider):
-    def __init__(self) -> None:
-        settings = get_settings()
-        session_kwargs: dict[str, Any] = {"region_name": settings.aws_region}
-        if settings.aws_profile:
-            session_kwargs["profile_name"] = settings.aws_profile
-        session = boto3.Session(**session_kwargs)
-        self._client = session.client("bedrock-runtime", config=Config(retries={"max_attempts": 3}))
+    def __init__(self, client: Any | None = None, settings: Settings | None = None) -> None:
+        settings = settings or get_settings()
+        self._client = client if client is not None else bedrock_runtime(settings)
         self._model_id = settings.bedrock_model_id_nova_lite
+        # The shared client does not retry, so this policy owns every attempt.
+        self._retry = RetryPolicy(
+            "nova_lite",
+            max_attempts=settings.nova_lite_max_attempts,
+            backoff_base_s=settings.nova_lite_backoff_base_s,
+            backoff_max_s=settings.nova_lite_backoff_max_s,
+        )
+        self._hedger: Hedger | None = None
+        if settings.nova_lite_hedge_enabled:
+            self._hedger = Hedger(
+                self._model_id,
+                percentile=settings.nova_lite_hedge_percentile,
+                max_rate=settings.nova_lite_hedge_max_rate,
+                min_samples=settings.nova_lite_hedge_min_samples,
+                window=settings.nova_lite_hedge_window,
+                # Room for a primary and a hedge per blocking-pool thread.
+                max_workers=2 * settings.blocking_pool_workers,
+            )
         self._prompt_builder = PromptBuilder()
 
     def generate_json(self, prompt: str) -> LLMResponse:
+        return self._retry.call(lambda attempt: self._hedged_attempt(prompt, attempt))
+
+    async def agenerate_json(self, prompt: str) -> LLMResponse:
+        """Like `generate_json`, but only the Bedrock call holds a pool thread; backoff waits on the event loop."""
+        return await self._retry.acall(lambda attempt: self._hedged_attempt(prompt, attempt))
+
+    def _hedged_attempt(self, prompt: str, attempt: int) -> LLMResponse:
+        # Retries cover failures; a hedge covers an attempt that is merely slow.
+        if self._hedger is None:
+            return self._attempt(prompt, attempt)
+        return self._hedger.call(lambda: self._attempt(prompt, attempt))
+
+    def _attempt(self, prompt: str, attempt: int) -> LLMResponse:
         payload = {
             "messages": [{"role": "user", "content": [{"text": prompt}]}],
             "inferenceConfig": {"maxTokens": 1800, "temperature": 0.2, "topP": 0.9},
         }
-        max_attempts = 3
-        retry_count = 0
-        last_exc: Exception | None = None
-        for attempt in range(1, max_attempts + 1):
-            start = time.perf_counter()
-            logger.info("bedrock_request", extra={"model_id": self._model_id, "prompt_chars": len(prompt), "attempt": attempt})
-            try:
-                try:
-                    resp = self._client.converse(modelId=self._model_id, **payload)
-                    text, usage = self._extract_converse_payload(resp)
-                except (AttributeError, ClientError) as exc:
-                    if isinstance(exc, ClientError):
-                        code = exc.response.get("Error", {}).get("Code", "")
-                        if code not in {"UnknownOperationException", "ValidationException"}:
-                            raise
-                    resp = self._client.invoke_model(modelId=self._model_id, body=json.dumps(payload))
-                    invoke_payload = json.loads(resp["body"].read())
-                    text, usage = self._extract_invoke_payload(invoke_payload)
-                latency_ms = int((time.perf_counter() - start) * 1000)
-                json_text = self._extract_first_json(text) or "{}"
-                logger.info("bedrock_response", extra={"model_id": self._model_id, "latency_ms": latency_ms, "attempt": attempt})
-                return LLMResponse(
-                    content=json_text,
-                    model_id=self._model_id,
-                    latency_ms=latency_ms,
-                    tokens_input=usage.get("inputTokens"),
-                    tokens_output=usage.get("outputTokens"),
-                    retry_count=retry_count,
-                )
-            except Exception as exc:
-                last_exc = exc
-                if attempt >= max_attempts:
-                    break
-                retry_count += 1
-                sleep_s = min(8.0, (2 ** (attempt - 1)) + random.uniform(0.0, 0.3))
-                time.sleep(sleep_s)
-        assert last_exc is not None
-        raise last_exc
+        start = time.perf_counter()
+        logger.info("bedrock_request", extra={"model_id": self._model_id, "prompt_chars": len(prompt), "attempt": attempt})
+        try:
+            resp = self._client.converse(modelId=self._model_id, **payload)
+            text, usage = self._extract_converse_payload(resp)
+        except (AttributeError, ClientError) as exc:
+            if isinstance(exc, ClientError):
+                code = exc.response.get("Error", {}).get("Code", "")
+                if code not in {"UnknownOperationException", "ValidationException"}:
+                    raise
+            resp = self._client.invoke_model(modelId=self._model_id, body=json.dumps(payload))
+            invoke_payload = json.loads(resp["body"].read())
+            text, usage = self._extract_invoke_payload(invoke_payload)
+        latency_ms = int((time.perf_counter() - start) * 1000)
+        json_text = self._extract_first_json(text) or "{}"
+        logger.info("bedrock_response", extra={"model_id": self._model_id, "latency_ms": latency_ms, "attempt": attempt})
+        return LLMResponse(
+            content=json_text,
+            model_id=self._model_id,
+            latency_ms=latency_ms,
+            tokens_input=usage.get("inputTokens"),
+            tokens_output=usage.get("outputTokens"),
+            retry_count=attempt - 1,
+        )
 
     def simulate_decision(self, prompt: str, context: list[str], constraints: dict[str, Any]) -> SimulationResult:
         _ = context, constraints
@@ -77,26 +90,40 @@ class NovaLiteClient(LLMProvider):
         try:
             result = SimulationResult.model_validate_json(primary.content)
         except Exception as exc:
-            repair_prompt = self._prompt_builder.build_repair(primary.content, str(exc))
-            repaired = self.generate_json(repair_prompt)
-            result = SimulationResult.model_validate_json(repaired.content)
+            repaired = self.generate_json(self._prompt_builder.build_repair(primary.content, str(exc)))
+            return self._audited(SimulationResult.model_validate_json(repaired.content), primary, repaired)
+        return self._audited(result, primary)
+
+    async def asimulate_decision(self, prompt: str, context: list[str], constraints: dict[str, Any]) -> SimulationResult:
+        _ = context, constraints
+        primary = await self.agenerate_json(prompt)
+        try:
+            result = SimulationResult.model_validate_json(primary.content)
+        except Exception as exc:
+            repaired = await self.agenerate_json(self._prompt_builder.build_repair(primary.content, str(exc)))
+            return self._audited(SimulationResult.model_validate_json(repaired.content), primary, repaired)
+        return self._audited(result, primary)
+
+    @staticmethod
+    def _audited(result: SimulationResult, primary: LLMResponse, repaired: LLMResponse | None = None) -> SimulationResult:
+        if repaired is None:
             result.audit = AuditMeta(
-                model_id=repaired.model_id,
-                latency_ms=primary.latency_ms + repaired.latency_ms,
-                tokens_input=(primary.tokens_input or 0) + (repaired.tokens_input or 0),
-                tokens_output=(primary.tokens_output or 0) + (repaired.tokens_output or 0),
-                retry_count=primary.retry_count + repaired.retry_count,
-                used_repair_pass=True,
+                model_id=primary.model_id,
+                latency_ms=primary.latency_ms,
+                tokens_input=primary.tokens_input,
+                tokens_output=primary.tokens_output,
+                retry_count=primary.retry_count,
+                used_repair_pass=False,
                 used_mock=False,
             )
             return result
         result.audit = AuditMeta(
-            model_id=primary.model_id,
-            latency_ms=primary.latency_ms,
-            tokens_input=primary.tokens_input,
-            tokens_output=primary.tokens_output,
-            retry_count=primary.retry_count,
-            used_repair_pass=False,
+            model_id=repaired.model_id,
+            latency_ms=primary.latency_ms + repaired.latency_ms,
+            tokens_input=(primary.tokens_input or 0) + (repaired.tokens_input or 0),
+            tokens_output=(primary.tokens_output or 0) + (repaired.tokens_output or 0),
+            retry_count=primary.retry_count + repaired.retry_count,
+            used_repair_pass=True,
             used_mock=False,
         )
         return result
@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Any
 
+from app.core.blocking import run_blocking
 from app.schemas import SimulationResult
 
 
@@ -15,6 +16,10 @@ class LLMResponse:
     retry_count: int = 0
 
 
+# Each provider has async variants (`a`-prefixed) for the request path. By default they
+# run the sync method on the blocking pool; providers with native async I/O override them.
+
+
 class LLMProvider(ABC):
     @abstractmethod
     def simulate_decision(self, prompt: str, context: list[str], constraints: dict[str, Any]) -> SimulationResult:
@@ -24,6 +29,12 @@ class LLMProvider(ABC):
     def generate_json(self, prompt: str) -> LLMResponse:
         raise NotImplementedError
 
+    async def asimulate_decision(self, prompt: str, context: list[str], constraints: dict[str, Any]) -> SimulationResult:
+        return await run_blocking(self.simulate_decision, prompt, context, constraints)
+
+    async def agenerate_json(self, prompt: str) -> LLMResponse:
+        return await run_blocking(self.generate_json, prompt)
+
 
 class SpeechProvider(ABC):
     @abstractmethod
@@ -34,8 +45,17 @@ class SpeechProvider(ABC):
     def process_audio_chunk(self, session_id: str, audio_chunk: bytes) -> dict[str, Any]:
         raise NotImplementedError
 
+    async def acreate_session(self) -> str:
+        return await run_blocking(self.create_session)
+
+    async def aprocess_audio_chunk(self, session_id: str, audio_chunk: bytes) -> dict[str, Any]:
+        return await run_blocking(self.process_audio_chunk, session_id, audio_chunk)
+
 
 class EmbeddingProvider(ABC):
+    # Identifies the vector space; cached embeddings are only reused under the same id.
+    model_id: str = "unknown"
+
     @abstractmethod
     def embed_texts(self, texts: list[str]) -> list[list[float]]:
         raise NotImplementedError
@@ -44,8 +64,23 @@ class EmbeddingProvider(ABC):
     def embed_query(self, text: str) -> list[float]:
         raise NotImplementedError
 
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(t) for t in texts]
+
+    async def aembed_texts(self, texts: list[str]) -> list[list[float]]:
+        return await run_blocking(self.embed_texts, texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await run_blocking(self.embed_query, text)
+
+    async def aembed_queries(self, texts: list[str]) -> list[list[float]]:
+        return await run_blocking(self.embed_queries, texts)
+
 
 class AgentAutomationProvider(ABC):
     @abstractmethod
     def run_playbook(self, name: str, payload: dict[str, Any]) -> dict[str, Any]:
         raise NotImplementedError
+
+    async def arun_playbook(self, name: str, payload: dict[str, Any]) -> dict[str, Any]:
+        return await run_blocking(self.run_playbook, name, payload)
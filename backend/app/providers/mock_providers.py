@@ -1,3 +1,4 @@
+import asyncio
 import hashlib
 import json
 import math
@@ -135,6 +136,7 @@ class MockSpeechProvider(SpeechProvider):
 
 class MockEmbeddingProvider(EmbeddingProvider):
     dim: int = 32
+    model_id: str = "mock-sha256-32"
 
     def _embed(self, text: str) -> list[float]:
         h = hashlib.sha256(text.encode("utf-8")).digest()
@@ -152,6 +154,14 @@ class MockEmbeddingProvider(EmbeddingProvider):
 class MockNovaActProvider(AgentAutomationProvider):
     def run_playbook(self, name: str, payload: dict[str, Any]) -> dict[str, Any]:
         time.sleep(0.02)
+        return self._result(name, payload)
+
+    async def arun_playbook(self, name: str, payload: dict[str, Any]) -> dict[str, Any]:
+        await asyncio.sleep(0.02)
+        return self._result(name, payload)
+
+    @staticmethod
+    def _result(name: str, payload: dict[str, Any]) -> dict[str, Any]:
         return {
             "playbook": name,
             "status": "stubbed",
@@ -1,33 +1,50 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
-import boto3
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 
-from app.core.config import get_settings
+from app.core.config import Settings, get_settings
+from app.core.deadline import Deadline, current_deadline
+from app.core.ratelimit import TokenBucket
+from app.core.retry import RetryPolicy
+from app.providers.bedrock_client import bedrock_runtime
 from app.providers.interfaces import EmbeddingProvider
 
 
 class NovaEmbeddingsClient(EmbeddingProvider):
-    def __init__(self) -> None:
-        settings = get_settings()
-        session_kwargs: dict[str, Any] = {"region_name": settings.aws_region}
-        if settings.aws_profile:
-            session_kwargs["profile_name"] = settings.aws_profile
-        session = boto3.Session(**session_kwargs)
-        self._client = session.client("bedrock-runtime")
-        self._model_id = settings.nova_embeddings_model_id
-
-    def _embed_single(self, text: str) -> list[float]:
+    """Bedrock embeddings with a bounded worker pool, a shared token bucket and jittered retries on transient errors."""
+
+    def __init__(self, client: Any | None = None, settings: Settings | None = None) -> None:
+        settings = settings or get_settings()
+        # Throttling retries are handled here, after the rate limiter; the shared client does not retry.
+        self._client = client if client is not None else bedrock_runtime(settings)
+        self.model_id = settings.nova_embeddings_model_id
+        self._limiter = TokenBucket(settings.nova_embeddings_rps, settings.nova_embeddings_burst)
+        self._retry = RetryPolicy(
+            "nova_embeddings",
+            max_attempts=settings.nova_embeddings_max_attempts,
+            backoff_base_s=settings.nova_embeddings_backoff_base_s,
+            backoff_max_s=settings.nova_embeddings_backoff_max_s,
+        )
+        self._pool = ThreadPoolExecutor(max_workers=settings.nova_embeddings_concurrency, thread_name_prefix="nova-embed")
+
+    def _embed_single(self, text: str, deadline: Deadline | None = None) -> list[float]:
         body = json.dumps({"inputText": text})
-        try:
-            response = self._client.invoke_model(
-                modelId=self._model_id,
+
+        def attempt(_: int) -> dict:
+            # Every attempt, retries included, takes a token so backoff cannot exceed the rate limit.
+            self._limiter.acquire()
+            return self._client.invoke_model(
+                modelId=self.model_id,
                 body=body,
                 contentType="application/json",
                 accept="application/json",
             )
-        except ClientError as exc:
+
+        try:
+            response = self._retry.call(attempt, deadline)
+        except (BotoCoreError, ClientError) as exc:
             raise RuntimeError(f"Bedrock embeddings call failed: {exc}") from exc
         payload = json.loads(response["body"].read())
         embedding = payload.get("embedding") or payload.get("embeddings", [None])[0]
@@ -36,7 +53,15 @@ class NovaEmbeddingsClient(EmbeddingProvider):
         return embedding
 
     def embed_texts(self, texts: list[str]) -> list[list[float]]:
-        return [self._embed_single(t) for t in texts]
+        if len(texts) <= 1:
+            return [self._embed_single(t) for t in texts]
+        # Pool threads do not inherit the caller's context, so the deadline is passed explicitly.
+        deadline = current_deadline()
+        # map() yields in input order regardless of completion order.
+        return list(self._pool.map(lambda t: self._embed_single(t, deadline), texts))
 
     def embed_query(self, text: str) -> list[float]:
         return self._embed_single(text)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_texts(texts)
@@ -1,10 +1,17 @@
 from datetime import datetime, timezone
-from typing import Literal
+from typing import Annotated, Literal
 from uuid import uuid4
 
 from pydantic import BaseModel, Field, field_validator, model_validator
 
 
+DEFAULT_NAMESPACE = "default"
+# Namespaces name directories on disk, so they are restricted to a safe slug.
+NAMESPACE_PATTERN = r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$"
+Namespace = Annotated[str, Field(pattern=NAMESPACE_PATTERN)]
+NamespaceList = Annotated[list[Namespace], Field(min_length=1, max_length=16)]
+
+
 SEVERITY_MAP: dict[str, tuple[str, int]] = {
     "low": ("low", 1),
     "minor": ("low", 1),
@@ -95,6 +102,11 @@ class AuditMeta(BaseModel):
     tokens_input: int | None = None
     tokens_output: int | None = None
     retry_count: int = 0
+    provider_attempts: int = 0
+    retry_wait_ms: int = 0
+    elapsed_ms: int = 0
+    deadline_ms: int | None = None
+    hedge_count: int = 0
     used_repair_pass: bool = False
     used_mock: bool = True
     embedding_docs_used: int = 0
@@ -135,6 +147,7 @@ class SimulateRequest(BaseModel):
     decision_text: str | None = None
     transcript: str | None = None
     context_doc_ids: list[str] = Field(default_factory=list)
+    namespace: Namespace = DEFAULT_NAMESPACE
     constraints: dict[str, str | int | float | bool | list[str]] = Field(default_factory=dict)
 
     @model_validator(mode="after")
@@ -168,21 +181,80 @@ class DecisionSpecRequest(BaseModel):
 class KBQueryRequest(BaseModel):
     query: str
     top_k: int = Field(default=5, ge=1, le=20)
+    nprobe: int | None = Field(default=None, ge=1, le=65536)
+    ef_search: int | None = Field(default=None, ge=1, le=4096)
+    mode: Literal["vector", "hybrid"] = "vector"
+    # A list fans the query out across those namespaces and merges their top-k.
+    namespace: Namespace | NamespaceList = DEFAULT_NAMESPACE
 
 
 class KBMatch(BaseModel):
     text: str
     source: str
     score: float
+    namespace: str = DEFAULT_NAMESPACE
 
 
 class KBQueryResponse(BaseModel):
     matches: list[KBMatch]
 
 
+class KBQueryBatchRequest(BaseModel):
+    queries: list[str] = Field(min_length=1, max_length=64)
+    top_k: int = Field(default=5, ge=1, le=20)
+    nprobe: int | None = Field(default=None, ge=1, le=65536)
+    ef_search: int | None = Field(default=None, ge=1, le=4096)
+    namespace: Namespace | NamespaceList = DEFAULT_NAMESPACE
+
+
+class KBQueryBatchResult(BaseModel):
+    query: str
+    matches: list[KBMatch]
+
+
+class KBQueryBatchResponse(BaseModel):
+    results: list[KBQueryBatchResult]
+
+
 class KBUploadResponse(BaseModel):
+    job_id: str
+    doc_id: str
+    status: str
+
+
+class KBDeleteResponse(BaseModel):
+    doc_id: str
+    chunks_deleted: int
+
+
+class KBStatsResponse(BaseModel):
+    namespace: str
+    documents: int
+    live_chunks: int
+    index_vectors: int
+    dead_vectors: int
+    dead_ratio: float
+    index_type: str
+    vector_storage: str
+    db_bytes: int
+    db_free_bytes: int
+    shards: dict[str, int]
+    caches: dict[str, dict]
+
+
+class KBJobStatus(BaseModel):
+    job_id: str
+    filename: str
     doc_id: str
-    chunks: int
+    namespace: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    chunks_embedded: int
+    chunks_indexed: int
+    chunks_per_s: float
+    error: dict[str, str] | None = None
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
 
 
 class VoiceSessionResponse(BaseModel):
@@ -1,5 +1,8 @@
 import json
+from contextlib import nullcontext
 
+from app.core.blocking import run_blocking
+from app.core.deadline import Deadline, deadline_scope
 from app.kb.service import KBService
 from app.providers.interfaces import LLMProvider
 from app.schemas import DecisionSpec, RecommendedPath, SimulateRequest, SimulationResult, TopRisk
@@ -13,12 +16,31 @@ class SimulationService:
         self._kb = kb_service
         self._prompts = PromptBuilder()
 
-    def run(self, req: SimulateRequest) -> SimulationResult:
-        decision_text = req.decision_text or req.transcript or ""
-        decision_spec = self.extract_decision_spec(decision_text)
-        retrieved = self._kb.context_for_docs(req.context_doc_ids)
-        prompt = self._prompts.build(decision_text, retrieved, req.constraints, decision_spec=decision_spec)
-        result = self._llm.simulate_decision(prompt, retrieved, req.constraints)
+    def run(self, req: SimulateRequest, deadline: Deadline | None = None) -> SimulationResult:
+        deadline = deadline or Deadline()
+        with deadline_scope(deadline):
+            decision_text = req.decision_text or req.transcript or ""
+            decision_spec = self.extract_decision_spec(decision_text)
+            retrieved = self._kb.context_for_docs(req.context_doc_ids, decision_text, namespace=req.namespace)
+            prompt = self._prompts.build(decision_text, retrieved, req.constraints, decision_spec=decision_spec)
+            result = self._llm.simulate_decision(prompt, retrieved, req.constraints)
+        return self._finish(result, retrieved, deadline)
+
+    async def arun(self, req: SimulateRequest, deadline: Deadline | None = None) -> SimulationResult:
+        """`run` for the request path: LLM calls go through the async provider API, KB lookups to the blocking pool.
+
+        Every provider call made for the request, retries included, draws on `deadline`.
+        """
+        deadline = deadline or Deadline()
+        with deadline_scope(deadline):
+            decision_text = req.decision_text or req.transcript or ""
+            decision_spec = await self.aextract_decision_spec(decision_text)
+            retrieved = await run_blocking(self._kb.context_for_docs, req.context_doc_ids, decision_text, namespace=req.namespace)
+            prompt = self._prompts.build(decision_text, retrieved, req.constraints, decision_spec=decision_spec)
+            result = await self._llm.asimulate_decision(prompt, retrieved, req.constraints)
+        return self._finish(result, retrieved, deadline)
+
+    def _finish(self, result: SimulationResult, retrieved: list[str], deadline: Deadline) -> SimulationResult:
         result.branches = limit_branches(result.branches)
         for branch in result.branches:
             llm_score = branch.llm_stability_score if branch.llm_stability_score is not None else (branch.stability_score or 50.0)
@@ -35,13 +57,28 @@ class SimulationService:
             max_words=150,
         )
         result.audit.embedding_docs_used = len(retrieved)
+        # Request-wide totals: they also cover decision-spec extraction and the context embedding.
+        result.audit.retry_count = deadline.retries
+        result.audit.provider_attempts = deadline.attempts
+        result.audit.retry_wait_ms = int(deadline.retry_wait_s * 1000)
+        result.audit.elapsed_ms = deadline.elapsed_ms()
+        result.audit.deadline_ms = int(deadline.timeout_s * 1000) if deadline.timeout_s is not None else None
+        result.audit.hedge_count = deadline.hedges
         return result
 
-    def extract_decision_spec(self, transcript: str) -> DecisionSpec:
-        prompt = self._prompts.build_decision_spec(transcript)
-        raw = self._llm.generate_json(prompt)
+    def extract_decision_spec(self, transcript: str, deadline: Deadline | None = None) -> DecisionSpec:
+        with deadline_scope(deadline) if deadline else nullcontext():
+            raw = self._llm.generate_json(self._prompts.build_decision_spec(transcript))
+        return self._parse_decision_spec(raw.content, transcript)
+
+    async def aextract_decision_spec(self, transcript: str, deadline: Deadline | None = None) -> DecisionSpec:
+        with deadline_scope(deadline) if deadline else nullcontext():
+            raw = await self._llm.agenerate_json(self._prompts.build_decision_spec(transcript))
+        return self._parse_decision_spec(raw.content, transcript)
+
+    def _parse_decision_spec(self, content: str, transcript: str) -> DecisionSpec:
         try:
-            parsed = json.loads(raw.content)
+            parsed = json.loads(content)
             return DecisionSpec.model_validate(parsed)
         except Exception:
             return self._deterministic_decision_spec(transcript)
@@ -11,3 +11,8 @@ class VoiceService:
     def process_chunk(self, session_id: str, audio_bytes: bytes) -> dict:
         return self._speech_provider.process_audio_chunk(session_id, audio_bytes)
 
+    async def acreate_session(self) -> str:
+        return await self._speech_provider.acreate_session()
+
+    async def aprocess_chunk(self, session_id: str, audio_bytes: bytes) -> dict:
+        return await self._speech_provider.aprocess_audio_chunk(session_id, audio_bytes)
@@ -0,0 +1,75 @@
+import time
+from contextlib import ExitStack
+from typing import Callable
+
+import pytest
+
+from app.core.config import Settings
+from app.kb.service import KBService
+from app.kb.store import KBStore
+from app.providers.interfaces import EmbeddingProvider
+from app.providers.mock_providers import MockEmbeddingProvider
+from app.schemas import DEFAULT_NAMESPACE
+
+
+def _wait_for(predicate: Callable[[], bool], timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.02)
+
+
+@pytest.fixture
+def wait_for() -> Callable[..., None]:
+    """Poll a predicate until it holds, failing the test after `timeout` seconds."""
+    return _wait_for
+
+
+@pytest.fixture
+def kb_settings(tmp_path) -> Callable[..., Settings]:
+    """Build Settings whose KB database, index, namespaces and embedding cache live under `tmp_path`."""
+
+    def make(**overrides) -> Settings:
+        paths = {
+            "kb_db_path": str(tmp_path / "kb.sqlite3"),
+            "kb_index_path": str(tmp_path / "kb.faiss"),
+            "kb_namespace_dir": str(tmp_path / "namespaces"),
+            "kb_embedding_cache_path": str(tmp_path / "embeddings.sqlite3"),
+        }
+        return Settings(**{**paths, **overrides})
+
+    return make
+
+
+@pytest.fixture
+def open_kb_store(kb_settings) -> Callable[..., KBStore]:
+    """Open a KBStore on the `kb_settings` files; opening it again stands in for a restart or another worker."""
+
+    def make(**overrides) -> KBStore:
+        settings = kb_settings(**overrides)
+        return KBStore(settings.kb_db_path, settings.kb_index_path, settings)
+
+    return make
+
+
+@pytest.fixture
+def kb_service(kb_settings) -> Callable[..., KBService]:
+    """Build a KBService on `kb_settings`; its shards are closed when the test ends."""
+    services: list[KBService] = []
+
+    def make(embedder: EmbeddingProvider | None = None, **overrides) -> KBService:
+        service = KBService(embedder or MockEmbeddingProvider(), kb_settings(**overrides))
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service._shards.close()
+
+
+@pytest.fixture
+def kb_store(kb_service) -> Callable[[KBService], KBStore]:
+    """The default-namespace store of a service, leased until the test ends so it cannot be evicted mid-test."""
+    with ExitStack() as leases:
+        yield lambda service: leases.enter_context(service._shards.lease(DEFAULT_NAMESPACE))
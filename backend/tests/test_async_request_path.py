@@ -0,0 +1,97 @@
+import asyncio
+import json
+import time
+
+from app.providers.mock_providers import MockLLMProvider
+from app.sim.service import SimulationService
+
+
+class SlowLLMProvider(MockLLMProvider):
+    """A blocking provider, like boto3 against a slow Bedrock endpoint."""
+
+    def generate_json(self, prompt):
+        time.sleep(0.3)
+        return super().generate_json(prompt)
+
+    def simulate_decision(self, prompt, context, constraints):
+        time.sleep(0.3)
+        return super().simulate_decision(prompt, context, constraints)
+
+
+async def _request(app, method: str, path: str, body: dict | None = None) -> tuple[int, dict]:
+    """Drive one HTTP request through the ASGI app directly (no HTTP client needed)."""
+    raw = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"test"), (b"content-type", b"application/json"), (b"content-length", str(len(raw)).encode())],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+    request_sent = False
+    done = asyncio.Event()
+    status = 0
+    chunks: list[bytes] = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": raw, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                done.set()
+
+    await app(scope, receive, send)
+    return status, json.loads(b"".join(chunks) or b"null")
+
+
+def test_health_stays_fast_while_simulations_block_on_the_provider(tmp_path, monkeypatch, kb_service):
+    monkeypatch.chdir(tmp_path)
+    from app.deps import get_sim_service
+    from app.main import app
+
+    sim_service = SimulationService(SlowLLMProvider(), kb_service())
+    app.dependency_overrides[get_sim_service] = lambda: sim_service
+
+    async def scenario() -> tuple[list[float], list[int], float]:
+        started = time.perf_counter()
+        simulations = [
+            asyncio.create_task(_request(app, "POST", "/simulate", {"decision_text": f"Acquire competitor {i}?"}))
+            for i in range(4)
+        ]
+        await asyncio.sleep(0.05)
+        latencies = []
+        for _ in range(10):
+            t0 = time.perf_counter()
+            status, body = await _request(app, "GET", "/health")
+            latencies.append(time.perf_counter() - t0)
+            assert (status, body) == (200, {"status": "ok"})
+            await asyncio.sleep(0.02)
+        statuses = [status for status, _ in await asyncio.gather(*simulations)]
+        return latencies, statuses, time.perf_counter() - started
+
+    try:
+        latencies, statuses, elapsed = asyncio.run(scenario())
+    finally:
+        app.dependency_overrides.clear()
+    assert statuses == [200] * 4
+    # Each simulation blocks for 0.6 s; run on the event loop they would serialize (2.4 s)
+    # and every health check issued meanwhile would wait behind them.
+    assert max(latencies) < 0.1
+    assert elapsed < 1.5
@@ -0,0 +1,123 @@
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from botocore.exceptions import ReadTimeoutError
+
+from app.core.config import Settings
+from app.providers.bedrock_client import bedrock_runtime, warm_up
+from app.providers.bedrock_nova_lite import NovaLiteClient
+from app.providers.nova_embeddings import NovaEmbeddingsClient
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    """A local Bedrock runtime: answers InvokeModel with a fixed embedding and counts TCP connections."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _reply(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except BrokenPipeError:  # the client gave up on a slow reply
+            pass
+
+    def do_GET(self):
+        time.sleep(self.server.latency_s)
+        self._reply(200, {"asyncInvokeSummaries": []})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.server.latency_s)
+        self._reply(200, {"embedding": [1.0, 0.0]})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandIn)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.latency_s = 0.0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _settings(server, **overrides) -> Settings:
+    return Settings(
+        use_mock_providers=False,
+        bedrock_endpoint_url=f"http://127.0.0.1:{server.server_address[1]}",
+        nova_embeddings_rps=0,
+        **overrides,
+    )
+
+
+def test_providers_share_one_configured_client(stand_in):
+    settings = _settings(stand_in, bedrock_max_pool_connections=7, bedrock_read_timeout_s=12.0)
+    llm = NovaLiteClient(settings=settings)
+    embeddings = NovaEmbeddingsClient(settings=settings)
+    assert llm._client is embeddings._client is bedrock_runtime(settings)
+
+    config = llm._client.meta.config
+    assert config.max_pool_connections == 7
+    assert config.read_timeout == 12.0
+    assert config.connect_timeout == settings.bedrock_connect_timeout_s
+    assert config.tcp_keepalive is True
+    assert config.retries["total_max_attempts"] == 1
+    assert llm._client.meta.endpoint_url == settings.bedrock_endpoint_url
+
+
+def test_warm_up_opens_connections_that_requests_then_reuse(stand_in):
+    stand_in.latency_s = 0.05
+    settings = _settings(
+        stand_in, bedrock_max_pool_connections=4, bedrock_warmup_connections=4, nova_embeddings_concurrency=4
+    )
+
+    warm_up(settings)
+    assert stand_in.connections == 4
+
+    vectors = NovaEmbeddingsClient(settings=settings).embed_texts([f"text {i}" for i in range(16)])
+    assert len(vectors) == 16
+    assert stand_in.connections == 4
+
+
+def test_warm_up_logs_missing_credentials_instead_of_raising(stand_in, monkeypatch, tmp_path, caplog):
+    for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_SESSION_TOKEN", "AWS_PROFILE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("AWS_SHARED_CREDENTIALS_FILE", str(tmp_path / "credentials"))
+    monkeypatch.setenv("AWS_CONFIG_FILE", str(tmp_path / "config"))
+    monkeypatch.setenv("AWS_EC2_METADATA_DISABLED", "true")
+
+    with caplog.at_level(logging.WARNING, logger="app.providers.bedrock_client"):
+        warm_up(_settings(stand_in, bedrock_warmup_connections=2))
+
+    assert [r.message for r in caplog.records] == ["bedrock_warmup_failed"]
+    assert stand_in.connections == 0
+
+
+def test_read_timeout_applies(stand_in):
+    stand_in.latency_s = 1.0
+    settings = _settings(stand_in, bedrock_read_timeout_s=0.2)
+    started = time.perf_counter()
+    with pytest.raises(ReadTimeoutError):
+        bedrock_runtime(settings).invoke_model(modelId="m", body=b"{}")
+    assert time.perf_counter() - started < 0.8
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("index_type", ["hnsw", "ivf_flat"])
+def test_flat_index_is_promoted_in_background(open_kb_store, index_type, wait_for):
+    settings = {
+        "kb_index_type": index_type,
+        "kb_ann_promote_threshold": 400,
+        "kb_ann_min_recall": 0.5,
+        "kb_ivf_nlist": 8,
+        "kb_nprobe": 8,
+    }
+    store = open_kb_store(**settings)
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(500, 16)).astype(np.float32)
+    for start in range(0, 500, 100):
+        batch = vectors[start : start + 100]
+        store.add_chunks("doc.txt", [f"chunk {start + i}" for i in range(len(batch))], batch.tolist())
+        if start == 0:
+            assert store.index_type == "flat"
+
+    wait_for(lambda: store.index_type == index_type)
+    store.add_chunks("late.txt", ["late"], [vectors[7].tolist()])
+    matches = store.search(vectors[42].tolist(), top_k=1, nprobe=8, ef_search=128)
+    assert matches[0]["text"] == "chunk 42"
+    store.close()
+
+    reopened = open_kb_store(**settings)
+    assert reopened.index_type == index_type
+    assert len(reopened.search(vectors[7].tolist(), top_k=2)) == 2
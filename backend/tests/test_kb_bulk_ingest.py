@@ -0,0 +1,77 @@
+import os
+
+from app.kb.ingest import Manifest, bulk_ingest
+from app.kb.store import KBStore
+from app.providers.mock_providers import MockEmbeddingProvider
+
+
+class FlakyEmbedder(MockEmbeddingProvider):
+    def __init__(self, fail_on: str) -> None:
+        self.fail_on = fail_on
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        if any(self.fail_on in t for t in texts):
+            raise RuntimeError("throttled")
+        return super().embed_texts(texts)
+
+
+def _corpus(root) -> None:
+    (root / "decks").mkdir(parents=True)
+    for i in range(5):
+        (root / f"filing_{i}.txt").write_text(f"Filing {i} discusses covenant {i} and churn. " * 40)
+    (root / "decks" / "board.md").write_text("Board deck: hiring freeze until Q3. " * 40)
+    (root / "image.png").write_bytes(b"\x89PNG")
+
+
+def _run(tmp_path, open_kb_store, embedder=None):
+    store = open_kb_store(kb_chunk_size=200, kb_chunk_overlap=20, kb_ingest_batch_size=4)
+    manifest = Manifest(tmp_path / "manifest.jsonl")
+    report = bulk_ingest(tmp_path / "docs", store, embedder or MockEmbeddingProvider(), manifest, store._settings, processes=2)
+    return store, report
+
+
+def test_bulk_ingest_indexes_once_and_resumes_from_the_manifest(tmp_path, open_kb_store, monkeypatch):
+    absorbed: list[int] = []
+    catch_up = KBStore._catch_up
+
+    def counting_catch_up(self) -> int:
+        absorbed.append(catch_up(self))
+        return absorbed[-1]
+
+    monkeypatch.setattr(KBStore, "_catch_up", counting_catch_up)
+    _corpus(tmp_path / "docs")
+    store, report = _run(tmp_path, open_kb_store)
+    # Chunks go straight into the index built at the end, never into the live one first.
+    assert sum(absorbed) == 0
+    stats = store.stats()
+    assert (report.documents, report.skipped, report.failed) == (6, 0, 0)
+    assert stats["documents"] == 6
+    assert stats["index_vectors"] == stats["live_chunks"] == report.chunks
+    assert report.docs_per_s > 0 and report.chunks_per_s > 0 and report.mb_per_s > 0
+    assert "docs/s" in report.summary()
+    board_chunk = store.fetch_context_by_doc_ids(store.doc_ids_for_source("board.md"), limit=1)[0]
+    assert store.search(MockEmbeddingProvider().embed_query(board_chunk), top_k=1)[0]["source"] == "board.md"
+    store.close()
+
+    board = tmp_path / "docs" / "decks" / "board.md"
+    board.write_text("Board deck: hiring resumes in Q2. " * 40)
+    os.utime(board, ns=(board.stat().st_atime_ns, board.stat().st_mtime_ns + 10**9))
+    store, report = _run(tmp_path, open_kb_store)
+    assert (report.documents, report.skipped) == (1, 5)
+    assert store.stats()["documents"] == 6
+    assert sum(absorbed) == 0
+    assert len(store.doc_ids_for_source("board.md")) == 1
+    store.close()
+
+
+def test_failed_documents_are_retried_on_the_next_run(tmp_path, open_kb_store):
+    _corpus(tmp_path / "docs")
+    store, report = _run(tmp_path, open_kb_store, FlakyEmbedder(fail_on="Filing 3"))
+    assert (report.documents, report.failed) == (5, 1)
+    assert store.doc_ids_for_source("filing_3.txt") == []
+    store.close()
+
+    store, report = _run(tmp_path, open_kb_store)
+    assert (report.documents, report.skipped) == (1, 5)
+    assert store.stats()["documents"] == 6
+    store.close()
@@ -1,4 +1,4 @@
-from app.kb.chunker import chunk_text
+from app.kb.chunker import chunk_text, iter_chunks
 
 
 def test_chunking_with_overlap():
@@ -9,3 +9,10 @@ def test_chunking_with_overlap():
     assert len(chunks[1]) == 800
     assert len(chunks[2]) > 0
 
+
+def test_streamed_chunks_match_whole_text_across_arbitrary_splits():
+    text = "Revenue  grew\n\n12% in Q3.\tMargins held " * 40
+    expected = chunk_text(text, chunk_size=97, overlap=13)
+    for step in (1, 7, 64, len(text)):
+        pieces = [text[i : i + step] for i in range(0, len(text), step)]
+        assert list(iter_chunks(pieces, chunk_size=97, overlap=13)) == expected
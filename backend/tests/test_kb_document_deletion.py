@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.core.errors import AppError
+from app.kb import store as store_module
+from app.kb.store import KBStore
+
+
+def _add_documents(store: KBStore) -> None:
+    """Two 40-chunk documents whose vectors all sit close to the probe query."""
+    rng = np.random.default_rng(9)
+    for name in ("old.txt", "new.txt"):
+        vectors = np.ones((40, 8), dtype=np.float32) + rng.normal(scale=0.05, size=(40, 8)).astype(np.float32)
+        store.add_chunks(name, [f"{name} {i}" for i in range(40)], vectors.tolist())
+
+
+@pytest.mark.parametrize("backend", ["flat", "hnsw", "numpy"])
+def test_deleted_vectors_are_skipped_then_purged(open_kb_store, monkeypatch, backend):
+    if backend == "numpy":
+        monkeypatch.setattr(store_module, "faiss", None)
+    store = open_kb_store(kb_tombstone_compact_ratio=0.9)
+    _add_documents(store)
+    if backend == "hnsw":
+        # Rebuild from SQLite straight into HNSW instead of waiting on a background promotion.
+        store.close()
+        Path(store._index_path).unlink()
+        store = open_kb_store(kb_tombstone_compact_ratio=0.9, kb_index_type="hnsw", kb_ann_promote_threshold=1)
+    assert store.index_type == backend
+    old_doc = store.doc_ids_for_source("old.txt")[0]
+    assert store.delete_document(old_doc) == 40
+
+    matches = store.search([1.0] * 8, top_k=30)
+    assert len(matches) == 30
+    assert all(m["source"] == "new.txt" for m in matches)
+    stats = store.stats()
+    assert (stats["live_chunks"], stats["dead_vectors"], stats["index_vectors"]) == (40, 40, 80)
+    assert stats["dead_ratio"] == pytest.approx(0.5)
+
+    store.purge_tombstones()
+    stats = store.stats()
+    assert (stats["dead_vectors"], stats["index_vectors"], stats["db_free_bytes"]) == (0, 40, 0)
+    assert store._db.reader().execute("SELECT COUNT(*) FROM tombstones").fetchone()[0] == 0
+    assert len(store.search([1.0] * 8, top_k=50)) == 40
+    store.close()
+
+
+def test_tombstones_survive_restart_and_trigger_background_compaction(open_kb_store, wait_for):
+    store = open_kb_store(kb_tombstone_compact_ratio=0.9)
+    _add_documents(store)
+    store.delete_document(store.doc_ids_for_source("old.txt")[0])
+    store.close()
+
+    store = open_kb_store(kb_tombstone_compact_ratio=0.3)
+    assert store.stats()["dead_vectors"] == 40
+    assert all(m["source"] == "new.txt" for m in store.search([1.0] * 8, top_k=40))
+
+    store.delete_document(store.doc_ids_for_source("new.txt")[0])
+    wait_for(lambda: store.stats()["index_vectors"] == 0)
+    assert store.stats()["dead_vectors"] == 0
+    store.close()
+
+
+def test_upload_with_replace_swaps_out_the_previous_version(kb_service, kb_store):
+    service = kb_service()
+    first, _ = service.upload_document("deck.txt", b"Q3 plan: hire 40 engineers.")
+    service.upload_document("other.txt", b"Unrelated memo.")
+    second, _ = service.upload_document("deck.txt", b"Q3 plan (revised): hire 25 engineers.", replace=True)
+
+    assert kb_store(service).doc_ids_for_source("deck.txt") == [second]
+    texts = [m["text"] for m in service.query("Q3 hiring plan", top_k=5)]
+    assert "Q3 plan (revised): hire 25 engineers." in texts
+    assert "Q3 plan: hire 40 engineers." not in texts
+    assert service.stats()["documents"] == 2
+    with pytest.raises(AppError) as exc:
+        service.delete_document(first)
+    assert exc.value.status_code == 404
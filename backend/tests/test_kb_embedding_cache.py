@@ -0,0 +1,52 @@
+import numpy as np
+
+from app.core.config import Settings
+from app.kb.embedding_cache import CachedEmbeddingProvider, EmbeddingCache, text_hash
+from app.providers.mock_providers import MockEmbeddingProvider
+
+
+class CountingEmbedder(MockEmbeddingProvider):
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        self.calls.extend(texts)
+        return super().embed_texts(texts)
+
+
+def test_reupload_and_boilerplate_cost_no_embedding_calls(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    embedder = CountingEmbedder()
+    cache = EmbeddingCache(path, Settings())
+    provider = CachedEmbeddingProvider(embedder, cache)
+
+    disclaimer = "Past performance is not indicative of future results."
+    first = provider.embed_texts(["Q3 revenue grew 12%.", disclaimer, disclaimer])
+    assert embedder.calls == ["Q3 revenue grew 12%.", disclaimer]
+    assert first[1] == first[2] == MockEmbeddingProvider().embed_texts([disclaimer])[0]
+    cache.close()
+
+    # A fresh process reuses the on-disk cache, including whitespace-only differences.
+    cache = EmbeddingCache(path, Settings())
+    provider = CachedEmbeddingProvider(embedder, cache)
+    embedder.calls.clear()
+    again = provider.embed_texts(["Q3  revenue grew\n12%.", disclaimer])
+    assert embedder.calls == []
+    assert np.allclose(again[0], first[0])
+    assert cache.stats() == {"entries": 2, "hits": 2, "misses": 0}
+    cache.close()
+
+
+def test_cache_is_scoped_by_model_and_evicts_by_size_and_age(tmp_path, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), Settings(kb_embedding_cache_max_entries=3))
+    for i in range(5):
+        cache.put_many("m1", {text_hash(f"t{i}"): [float(i), 1.0]})
+    assert cache.stats()["entries"] == 3
+    assert set(cache.get_many("m1", [text_hash(f"t{i}") for i in range(5)])) == {text_hash(f"t{i}") for i in (2, 3, 4)}
+    assert cache.get_many("m2", [text_hash("t4")]) == {}
+
+    monkeypatch.setattr("app.kb.embedding_cache.time.time", lambda: 10**12)
+    assert cache.get_many("m1", [text_hash("t4")]) == {}
+    cache.put_many("m1", {text_hash("new"): [1.0, 0.0]})
+    assert cache.stats()["entries"] == 1
+    cache.close()
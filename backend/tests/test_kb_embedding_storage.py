@@ -0,0 +1,44 @@
+import json
+import sqlite3
+
+import numpy as np
+
+from app.kb import store as store_module
+from app.kb.store import KBStore
+from app.kb.vectors import pack_vector, unpack_vector
+
+
+def test_vector_blob_round_trip_is_zero_copy():
+    blob = pack_vector([0.25, -1.5, 3.0])
+    vec = unpack_vector(blob)
+    assert vec.dtype == np.float32
+    assert vec.tolist() == [0.25, -1.5, 3.0]
+    assert not vec.flags.writeable
+    assert len(blob) == 8 + 3 * 4
+
+
+def test_legacy_json_embeddings_are_migrated(tmp_path, monkeypatch):
+    db_path = tmp_path / "kb.sqlite3"
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE chunks (chunk_id TEXT PRIMARY KEY, doc_id TEXT NOT NULL, source TEXT NOT NULL, "
+        "text TEXT NOT NULL, metadata TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO chunks VALUES (?, ?, ?, ?, ?)",
+        ("c1", "d1", "legacy.txt", "legacy text", json.dumps({"dim": 2, "embedding": [1.0, 0.0]})),
+    )
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(store_module, "faiss", None)
+    store = KBStore(str(db_path), str(tmp_path / "kb.faiss"))
+
+    conn = sqlite3.connect(db_path)
+    metadata, blob = conn.execute("SELECT metadata, embedding FROM chunks").fetchone()
+    conn.close()
+    assert metadata is None
+    assert unpack_vector(blob).tolist() == [1.0, 0.0]
+    matches = store.search([1.0, 0.0], top_k=1)
+    assert matches[0]["text"] == "legacy text"
+    assert matches[0]["score"] > 0.99
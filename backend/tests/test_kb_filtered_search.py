@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from app.kb import store as store_module
+
+
+@pytest.mark.parametrize("backend", ["flat", "hnsw", "numpy"])
+def test_search_is_restricted_to_requested_documents(open_kb_store, monkeypatch, backend):
+    if backend == "numpy":
+        monkeypatch.setattr(store_module, "faiss", None)
+    store = open_kb_store(kb_index_type="hnsw" if backend == "hnsw" else "flat", kb_ann_promote_threshold=1)
+    rng = np.random.default_rng(11)
+    other_vectors = rng.normal(size=(50, 8)).astype(np.float32)
+    store.add_chunks("other.txt", [f"other {i}" for i in range(50)], other_vectors.tolist())
+    wanted_doc, _ = store.add_chunks("wanted.txt", ["near", "far"], [[1.0] + [0.0] * 7, [0.0] * 7 + [1.0]])
+
+    query = [0.9, 0.1] + [0.0] * 6
+    matches = store.search(query, top_k=5, doc_ids=[wanted_doc])
+    assert [m["text"] for m in matches] == ["near", "far"]
+    assert store.search(query, top_k=5, doc_ids=["missing"]) == []
+    store.close()
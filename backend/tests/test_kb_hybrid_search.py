@@ -0,0 +1,49 @@
+import threading
+
+import numpy as np
+
+from app.kb.hybrid import fts_query, reciprocal_rank_fusion
+from app.providers.mock_providers import MockEmbeddingProvider
+
+
+def test_fts_query_quotes_terms_and_rrf_rewards_agreement():
+    assert fts_query('AAPL "covenant" OR NEAR(x') == '"aapl" OR "covenant" OR "or" OR "near" OR "x"'
+    assert fts_query("  ?! ") == ""
+    scores, ids = reciprocal_rank_fusion([np.array([1, 2, 3]), np.array([3, 4, -1])], top_k=3)
+    assert list(ids) == [3, 1, 2]
+    assert scores[0] > scores[1] > scores[2]
+
+
+def test_hybrid_surfaces_exact_term_matches(kb_service, kb_store):
+    service = kb_service()
+    filler = [f"quarterly planning note number {i} about hiring and budgets" for i in range(300)]
+    store = kb_store(service)
+    store.add_chunks("notes.txt", filler, MockEmbeddingProvider().embed_texts(filler))
+    store.add_chunks("deal.txt", ["Covenant ZX-42 limits leverage for TSLA exposure."], MockEmbeddingProvider().embed_texts(["deal"]))
+
+    hybrid = service.query("TSLA covenant", top_k=3, mode="hybrid")
+    assert any(m["text"].startswith("Covenant ZX-42") for m in hybrid)
+    vector = service.query("TSLA covenant", top_k=3)
+    assert all(not m["text"].startswith("Covenant") for m in vector)
+
+
+def test_slow_keyword_leg_falls_back_to_vector_ranking(kb_service, kb_store, monkeypatch, caplog):
+    service = kb_service(kb_hybrid_budget_ms=20, kb_result_cache_size=0)
+    texts = [f"note {i} about gamma and delta" for i in range(10)]
+    store = kb_store(service)
+    store.add_chunks("a.txt", texts, MockEmbeddingProvider().embed_texts(texts))
+    released = threading.Event()
+
+    def stuck_keywords(query, top_k, doc_ids=None):
+        released.wait(timeout=10)
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+    monkeypatch.setattr(store, "rank_keywords", stuck_keywords)
+    # The keyword leg only returns once released, so a result here means the budget cut it off.
+    try:
+        hybrid = service.query("gamma", top_k=5, mode="hybrid")
+    finally:
+        released.set()
+    assert any(r.getMessage() == "kb_keyword_search_over_budget" for r in caplog.records)
+    vector = service.query("gamma", top_k=5)
+    assert [m["text"] for m in hybrid] == [m["text"] for m in vector]
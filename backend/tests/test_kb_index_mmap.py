@@ -0,0 +1,97 @@
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.kb.layered import LayeredIndex
+from app.kb.store import KBStore
+
+
+def _add(store: KBStore, name: str, n: int, seed: int) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(n, 16)).astype(np.float32)
+    store.add_chunks(name, [f"{name} {i}" for i in range(n)], vectors.tolist())
+    return vectors
+
+
+def test_snapshot_is_mapped_and_new_vectors_land_in_the_delta(open_kb_store):
+    store = open_kb_store()
+    base_vectors = _add(store, "base.txt", 40, 1)
+    store.close()
+
+    store = open_kb_store()
+    assert isinstance(store._index, LayeredIndex)
+    assert (store._index.base.ntotal, store._index.delta.ntotal) == (40, 0)
+    if sys.platform.startswith("linux"):
+        assert store._index_path in Path("/proc/self/maps").read_text()
+
+    delta_vectors = _add(store, "delta.txt", 5, 2)
+    assert (store._index.base.ntotal, store._index.delta.ntotal) == (40, 5)
+    assert store.search(base_vectors[3].tolist(), top_k=1)[0]["text"] == "base.txt 3"
+    assert store.search(delta_vectors[4].tolist(), top_k=1)[0]["text"] == "delta.txt 4"
+    store.close()
+    assert Path(store._delta_path).exists()
+
+    reopened = open_kb_store()
+    assert (reopened._index.base.ntotal, reopened._index.delta.ntotal) == (40, 5)
+    assert reopened.search(delta_vectors[2].tolist(), top_k=1)[0]["text"] == "delta.txt 2"
+    reopened.close()
+
+
+def test_oversized_delta_is_merged_in_the_background(open_kb_store):
+    store = open_kb_store(kb_index_compact_records=50)
+    _add(store, "base.txt", 40, 1)
+    store.compact_index()
+    _add(store, "more.txt", 60, 2)
+    deadline = time.monotonic() + 10
+    while store._index.delta.ntotal if isinstance(store._index, LayeredIndex) else True:
+        assert time.monotonic() < deadline, "delta was not merged"
+        time.sleep(0.02)
+    assert store._index.base.ntotal == 100
+    store.close()
+
+
+def test_delta_merge_keeps_deletions(open_kb_store):
+    store = open_kb_store(kb_tombstone_compact_ratio=0.9)
+    _add(store, "base.txt", 40, 1)
+    store.compact_index()
+    doomed = _add(store, "doomed.txt", 30, 2)
+    kept = _add(store, "kept.txt", 30, 3)
+    assert store.delete_document(store.doc_ids_for_source("doomed.txt")[0]) == 30
+
+    store.merge_delta()
+    assert (store._index.base.ntotal, store._index.delta.ntotal) == (70, 0)
+    assert store.stats()["dead_vectors"] == 0
+    assert store.search(kept[7].tolist(), top_k=1)[0]["text"] == "kept.txt 7"
+    assert all(m["source"] != "doomed.txt" for m in store.search(doomed[0].tolist(), top_k=10))
+    store.close()
+
+
+def test_leftover_delta_from_before_a_full_snapshot_is_ignored(open_kb_store, tmp_path):
+    store = open_kb_store()
+    _add(store, "base.txt", 10, 1)
+    store.compact_index()
+    _add(store, "more.txt", 5, 2)
+    store.compact_index()
+    shutil.copy(store._delta_path, tmp_path / "stale.delta")
+    store.merge_delta()
+    store.close()
+    # Simulate a crash between writing the merged base and removing the old delta.
+    shutil.copy(tmp_path / "stale.delta", store._delta_path)
+
+    reopened = open_kb_store()
+    assert reopened._index.ntotal == 15
+    reopened.close()
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_mmap_can_be_disabled(open_kb_store, mmap):
+    store = open_kb_store(kb_index_mmap=mmap)
+    _add(store, "a.txt", 10, 1)
+    store.close()
+    reopened = open_kb_store(kb_index_mmap=mmap)
+    assert isinstance(reopened._index, LayeredIndex) is mmap
+    assert reopened._index.ntotal == 10
+    reopened.close()
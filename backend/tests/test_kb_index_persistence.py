@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import faiss
+
+
+def test_uncompacted_vectors_are_caught_up_after_restart(open_kb_store):
+    store = open_kb_store()
+    store.add_chunks("a.txt", ["alpha"], [[1.0, 0.0, 0.0]])
+    store.compact_index()
+    store.add_chunks("b.txt", ["beta"], [[0.0, 1.0, 0.0]])
+
+    # Simulate a crash: no close(), so beta only exists in SQLite and is caught up from there.
+    restarted = open_kb_store()
+    assert restarted.stats()["index_vectors"] == 2
+    assert restarted.search([0.0, 1.0, 0.0], top_k=1)[0]["text"] == "beta"
+
+
+def test_compaction_folds_delta_into_base_index(open_kb_store):
+    store = open_kb_store()
+    store.add_chunks("a.txt", ["alpha"], [[1.0, 0.0, 0.0]])
+    store.compact_index()
+    assert faiss.read_index(store._index_path).ntotal == 1
+    store.add_chunks("b.txt", ["gamma"], [[0.0, 0.0, 1.0]])
+    assert store._index.delta.ntotal == 1
+
+    store.merge_delta()
+    assert faiss.read_index(store._index_path).ntotal == 2
+    assert store._index.delta.ntotal == 0
+    assert store.stats()["index_vectors"] == store._index.base.ntotal == 2
+    store.close()
+
+    reopened = open_kb_store()
+    texts = {m["text"] for m in reopened.search([0.0, 0.0, 1.0], top_k=5)}
+    assert texts == {"alpha", "gamma"}
+
+
+def test_index_is_rebuilt_from_sqlite_when_files_are_lost(open_kb_store):
+    store = open_kb_store()
+    store.add_chunks("a.txt", ["alpha", "beta"], [[1.0, 0.0], [0.0, 1.0]])
+    store.close()
+    Path(store._index_path).unlink()
+
+    rebuilt = open_kb_store()
+    assert rebuilt.search([0.0, 1.0], top_k=1)[0]["text"] == "beta"
+    assert Path(rebuilt._index_path).exists()
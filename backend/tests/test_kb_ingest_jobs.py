@@ -0,0 +1,71 @@
+import io
+import threading
+import time
+
+import pytest
+
+from app.core.errors import AppError
+from app.kb.jobs import IngestJobQueue
+from app.providers.mock_providers import MockEmbeddingProvider
+
+
+class GatedEmbedder(MockEmbeddingProvider):
+    def __init__(self) -> None:
+        self.gate = threading.Event()
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        self.gate.wait(timeout=5)
+        with self._lock:
+            self.running -= 1
+        if any("poison" in t for t in texts):
+            raise RuntimeError("model rejected input")
+        return super().embed_texts(texts)
+
+
+def test_jobs_report_progress_and_errors(kb_settings, kb_service, wait_for):
+    embedder = GatedEmbedder()
+    # The cache is off so every batch reaches the gated embedder.
+    overrides = {"kb_embedding_cache_enabled": False, "kb_ingest_batch_size": 4, "kb_chunk_size": 50, "kb_chunk_overlap": 0}
+    queue = IngestJobQueue(kb_service(embedder, **overrides), kb_settings(**overrides))
+    job = queue.submit("notes.txt", io.BytesIO(("revenue grew in the third quarter " * 40).encode()))
+    assert queue.get(job.job_id).status in ("queued", "running")
+    embedder.gate.set()
+
+    done = queue.get(job.job_id)
+    wait_for(lambda: done.finished_at is not None)
+    assert done.status == "succeeded"
+    assert done.chunks_embedded == done.chunks_indexed > 4
+    assert done.chunks_per_s > 0
+
+    failed = queue.submit("bad.txt", io.BytesIO(b"poison pill"))
+    wait_for(lambda: failed.finished_at is not None)
+    assert failed.status == "failed"
+    assert failed.error["code"] == "embedding_unavailable"
+    with pytest.raises(AppError) as exc:
+        queue.get("missing")
+    assert exc.value.status_code == 404
+    queue.shutdown()
+
+
+def test_queue_bounds_concurrency_and_backlog(kb_settings, kb_service, wait_for):
+    embedder = GatedEmbedder()
+    overrides = {"kb_embedding_cache_enabled": False, "kb_ingest_workers": 2, "kb_ingest_queue_size": 1}
+    queue = IngestJobQueue(kb_service(embedder, **overrides), kb_settings(**overrides))
+    jobs = [queue.submit(f"doc{i}.txt", io.BytesIO(b"some text")) for i in range(3)]
+    with pytest.raises(AppError) as exc:
+        queue.submit("overflow.txt", io.BytesIO(b"more text"))
+    assert exc.value.status_code == 429
+
+    time.sleep(0.1)
+    assert embedder.max_running == 2
+    embedder.gate.set()
+    wait_for(lambda: all(job.finished_at is not None for job in jobs))
+    assert all(job.status == "succeeded" for job in jobs)
+    assert queue.submit("later.txt", io.BytesIO(b"fits again")).status in ("queued", "running", "succeeded")
+    queue.shutdown()
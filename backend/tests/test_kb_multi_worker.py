@@ -0,0 +1,104 @@
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.kb import store as store_module
+from app.kb.filelock import FileLock
+
+
+def _vectors(n: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, 16)).astype(np.float32)
+
+
+@pytest.mark.parametrize("backend", ["faiss", "numpy"])
+def test_writes_in_one_worker_are_visible_in_another(open_kb_store, monkeypatch, backend):
+    if backend == "numpy":
+        monkeypatch.setattr(store_module, "faiss", None)
+    # Two stores on the same files stand in for separate uvicorn worker processes.
+    writer, reader = open_kb_store(kb_tombstone_compact_ratio=0.95), open_kb_store(kb_tombstone_compact_ratio=0.95)
+    before = reader.generation
+    vectors = _vectors(10, 1)
+    writer.add_chunks("a.txt", [f"a {i}" for i in range(10)], vectors.tolist())
+
+    assert reader.generation > before
+    assert reader.search(vectors[4].tolist(), top_k=1)[0]["text"] == "a 4"
+
+    writer.add_chunks("b.txt", ["b 0"], _vectors(1, 2).tolist())
+    writer.delete_document(writer.doc_ids_for_source("a.txt")[0])
+    matches = reader.search(vectors[4].tolist(), top_k=5)
+    assert [m["text"] for m in matches] == ["b 0"]
+    assert reader.stats()["dead_vectors"] == 10
+    writer.close()
+    reader.close()
+
+
+def test_published_snapshot_is_reloaded_by_other_workers(open_kb_store):
+    writer, reader = open_kb_store(kb_tombstone_compact_ratio=0.95), open_kb_store(kb_tombstone_compact_ratio=0.95)
+    vectors = _vectors(20, 1)
+    writer.add_chunks("a.txt", [f"a {i}" for i in range(20)], vectors.tolist())
+    writer.add_chunks("b.txt", ["b 0"], _vectors(1, 2).tolist())
+    writer.delete_document(writer.doc_ids_for_source("a.txt")[0])
+    reader.search(vectors[0].tolist(), top_k=1)
+
+    writer.purge_tombstones()
+    stats = reader.stats()
+    assert (stats["index_vectors"], stats["dead_vectors"]) == (1, 0)
+    assert [m["text"] for m in reader.search(vectors[0].tolist(), top_k=5)] == ["b 0"]
+    writer.close()
+    reader.close()
+
+
+def test_workers_starting_on_an_empty_kb_publish_nothing(open_kb_store):
+    workers = [open_kb_store() for _ in range(3)]
+    assert workers[0]._read_meta()["snapshot"] == 0
+    vectors = _vectors(5, 4)
+    workers[0].add_chunks("a.txt", [f"a {i}" for i in range(5)], vectors.tolist())
+    assert workers[2].search(vectors[1].tolist(), top_k=1)[0]["text"] == "a 1"
+    for worker in workers:
+        worker.close()
+
+
+def test_interleaved_writers_never_lose_vectors(open_kb_store):
+    workers = [open_kb_store() for _ in range(3)]
+    vectors = _vectors(60, 3)
+    for i, vec in enumerate(vectors):
+        worker = workers[i % 3]
+        worker.add_chunks(f"{i}.txt", [f"chunk {i}"], [vec.tolist()])
+        if i % 7 == 0:
+            worker.compact_index()
+    for worker in workers:
+        worker.close()
+
+    reopened = open_kb_store()
+    assert reopened.stats()["index_vectors"] == 60
+    for i in (0, 17, 59):
+        assert reopened.search(vectors[i].tolist(), top_k=1)[0]["text"] == f"chunk {i}"
+    reopened.close()
+
+
+def test_file_lock_excludes_other_processes(tmp_path):
+    lock_path = str(tmp_path / "kb.faiss.lock")
+    holder = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import sys, time\n"
+            "from app.kb.filelock import FileLock\n"
+            f"with FileLock({lock_path!r}):\n"
+            "    print('locked', flush=True)\n"
+            "    time.sleep(0.5)\n",
+        ],
+        cwd=Path(__file__).resolve().parents[1],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    assert holder.stdout.readline().strip() == "locked"
+    started = time.monotonic()
+    with FileLock(lock_path):
+        waited = time.monotonic() - started
+    holder.wait()
+    assert waited >= 0.3
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from app.core.errors import AppError
+from app.kb.shards import ShardSet
+
+
+def test_namespaces_are_isolated_and_fan_out_merges_by_score(kb_service):
+    service = kb_service()
+    service.upload_document("acme.txt", b"Acme covenant headroom is tight.", namespace="acme")
+    service.upload_document("globex.txt", b"Globex churn rose last quarter.", namespace="globex")
+    service.upload_document("house.txt", b"House view on rates.")
+
+    acme = service.query("covenant headroom", top_k=5, namespace="acme")
+    assert [(m["source"], m["namespace"]) for m in acme] == [("acme.txt", "acme")]
+    assert all(m["source"] == "house.txt" for m in service.query("covenant headroom", top_k=5))
+
+    merged = service.query("covenant headroom", top_k=5, namespace=["globex", "acme"])
+    assert {m["namespace"] for m in merged} == {"acme", "globex"}
+    assert [m["score"] for m in merged] == sorted((m["score"] for m in merged), reverse=True)
+    batch = service.query_batch(["covenant headroom"], top_k=5, namespace=["acme", "globex"])
+    assert batch[0] == merged
+    assert service.stats("acme")["documents"] == 1
+
+
+def test_unknown_and_invalid_namespaces_are_rejected(kb_service, tmp_path):
+    service = kb_service()
+    with pytest.raises(AppError) as missing:
+        service.query("anything", top_k=3, namespace="nobody")
+    assert missing.value.status_code == 404
+    with pytest.raises(AppError) as invalid:
+        service.query("anything", top_k=3, namespace="../escape")
+    assert invalid.value.status_code == 422
+    assert not (tmp_path / "namespaces" / "nobody").exists()
+
+
+def _fill(shards: ShardSet, namespace: str, n: int = 200) -> None:
+    vectors = np.random.default_rng(len(namespace)).normal(size=(n, 16)).astype(np.float32)
+    with shards.lease(namespace, create=True) as store:
+        store.add_chunks(f"{namespace}.txt", [f"{namespace} {i}" for i in range(n)], vectors.tolist())
+
+
+def test_shards_load_lazily_and_idle_ones_are_evicted_under_the_budget(kb_settings):
+    # Each 200 x 16 flat shard holds about 16 KB, so only two fit in the budget.
+    shards = ShardSet(kb_settings(kb_shard_memory_budget_mb=0.035))
+    assert shards.loaded() == []
+    for namespace in ("a", "b", "c"):
+        _fill(shards, namespace)
+    assert shards.loaded() == ["b", "c"]
+    assert shards.stats()["evictions"] == 1
+
+    with shards.lease("a") as store:
+        assert store.stats()["live_chunks"] == 200
+        _fill(shards, "d")
+        # "a" is leased, so the least recently used idle shards go instead.
+        assert "a" in shards.loaded()
+    assert shards.loaded() == ["a", "d"]
+    assert shards.stats()["memory_bytes"] <= shards.stats()["budget_bytes"]
+    shards.close()
@@ -0,0 +1,35 @@
+import pytest
+
+from app.kb import store as store_module
+from app.providers.mock_providers import MockEmbeddingProvider
+
+
+class BatchCountingEmbedder(MockEmbeddingProvider):
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        self.batches.append(list(texts))
+        return super().embed_queries(texts)
+
+
+@pytest.mark.parametrize("backend", ["faiss", "numpy"])
+def test_batch_results_match_individual_queries(kb_service, kb_store, monkeypatch, backend):
+    if backend == "numpy":
+        monkeypatch.setattr(store_module, "faiss", None)
+    embedder = BatchCountingEmbedder()
+    service = kb_service(embedder, kb_result_cache_size=0)
+    texts = [f"section {i} on covenants, churn and hiring" for i in range(200)]
+    kb_store(service).add_chunks("filing.txt", texts, embedder.embed_texts(texts))
+
+    service.query("churn risk", top_k=3)  # warms the query-embedding cache for one of the batch queries
+    queries = ["churn risk", "covenant breach", "hiring freeze", "covenant  breach"]
+    results = service.query_batch(queries, top_k=3)
+
+    assert embedder.batches == [["covenant breach", "hiring freeze"]]
+    assert len(results) == len(queries)
+    for query, matches in zip(queries, results):
+        assert len(matches) == 3
+        single = service.query(query, top_k=3)
+        assert [m["text"] for m in matches] == [m["text"] for m in single]
+        assert [m["score"] for m in matches] == pytest.approx([m["score"] for m in single], abs=1e-5)
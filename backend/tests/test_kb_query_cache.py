@@ -0,0 +1,55 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.kb.store import KBStore
+from app.providers.mock_providers import MockEmbeddingProvider
+
+
+class CountingQueryEmbedder(MockEmbeddingProvider):
+    def __init__(self, latency_s: float = 0.0) -> None:
+        self.latency_s = latency_s
+        self.query_calls = 0
+        self._lock = threading.Lock()
+
+    def embed_query(self, text: str) -> list[float]:
+        with self._lock:
+            self.query_calls += 1
+        time.sleep(self.latency_s)
+        return super().embed_query(text)
+
+
+def _add_notes(store: KBStore, embedder: MockEmbeddingProvider) -> None:
+    texts = ["leverage covenant", "churn outlook", "hiring plan"]
+    store.add_chunks("notes.txt", texts, embedder.embed_texts(texts))
+
+
+def test_repeated_and_concurrent_queries_embed_once(kb_service, kb_store):
+    embedder = CountingQueryEmbedder(latency_s=0.05)
+    service = kb_service(embedder)
+    _add_notes(kb_store(service), embedder)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: service.query("churn  outlook", top_k=2), range(8)))
+    assert embedder.query_calls == 1
+    assert all(r == results[0] for r in results)
+
+    service.query("churn outlook", top_k=3)  # different top_k: search again, embedding still cached
+    assert embedder.query_calls == 1
+    stats = service.cache_stats()
+    assert stats["query_embeddings"]["hits"] >= 1
+    assert stats["query_embeddings"]["single_flight_shared"] + stats["results"]["hits"] >= 7
+
+
+def test_result_cache_is_invalidated_by_writes(kb_service, kb_store):
+    embedder = CountingQueryEmbedder()
+    service = kb_service(embedder)
+    store = kb_store(service)
+    _add_notes(store, embedder)
+    before = service.query("churn outlook", top_k=5)
+    assert service.query("churn outlook", top_k=5) == before
+    assert service.cache_stats()["results"]["hits"] == 1
+
+    store.add_chunks("more.txt", ["churn outlook"], embedder.embed_texts(["churn outlook"]))
+    after = service.query("churn outlook", top_k=5)
+    assert len(after) == len(before) + 1
+    assert after[0]["source"] == "more.txt"
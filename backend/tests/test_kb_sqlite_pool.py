@@ -0,0 +1,33 @@
+import threading
+
+from app.core.config import Settings
+from app.kb.db import SQLitePool
+
+
+def test_readers_are_not_blocked_by_open_write_transaction(tmp_path):
+    pool = SQLitePool(str(tmp_path / "kb.sqlite3"), Settings(kb_sqlite_busy_timeout_ms=100))
+    with pool.writer() as conn:
+        conn.execute("CREATE TABLE t (v INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+    assert pool.reader().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    seen: list[int] = []
+    with pool.writer() as conn:
+        conn.execute("INSERT INTO t VALUES (2)")
+        reader = threading.Thread(target=lambda: seen.append(pool.reader().execute("SELECT COUNT(*) FROM t").fetchone()[0]))
+        reader.start()
+        reader.join()
+    assert seen == [1]
+    assert pool.reader().execute("SELECT COUNT(*) FROM t").fetchone()[0] == 2
+    pool.close()
+
+
+def test_reader_connections_are_reused_per_thread(tmp_path):
+    pool = SQLitePool(str(tmp_path / "kb.sqlite3"), Settings())
+    assert pool.reader() is pool.reader()
+    other: list = []
+    thread = threading.Thread(target=lambda: other.append(pool.reader()))
+    thread.start()
+    thread.join()
+    assert other[0] is not pool.reader()
+    pool.close()
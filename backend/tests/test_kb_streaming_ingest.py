@@ -0,0 +1,45 @@
+import io
+import tracemalloc
+
+import pytest
+
+from app.core.errors import AppError
+from app.providers.mock_providers import MockEmbeddingProvider
+
+
+_SETTINGS = {"kb_embedding_cache_enabled": False, "kb_ingest_batch_size": 32, "kb_index_compact_records": 10**9}
+
+
+def test_peak_memory_is_bounded_by_batch_not_document(kb_service, kb_store):
+    service = kb_service(**_SETTINGS)
+    line = "Covenant headroom narrowed as leverage rose to 3.4x while churn held at 2.1%. "
+    document = io.BytesIO((line * 50_000).encode("utf-8"))  # ~4 MB
+    tracemalloc.start()
+    doc_id, chunks = service.upload_document("filing.txt", document)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert chunks == len(kb_store(service).fetch_context_by_doc_ids([doc_id], limit=10**6))
+    assert chunks > 4_000
+    assert peak < 3 * 1024 * 1024
+
+
+class FailingEmbedder(MockEmbeddingProvider):
+    def __init__(self, fail_after: int) -> None:
+        self.batches = 0
+        self.fail_after = fail_after
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        self.batches += 1
+        if self.batches > self.fail_after:
+            raise RuntimeError("throttled")
+        return super().embed_texts(texts)
+
+
+def test_failed_batch_removes_partially_ingested_document(kb_service, kb_store):
+    embedder = FailingEmbedder(fail_after=2)
+    service = kb_service(embedder, **_SETTINGS)
+    with pytest.raises(AppError):
+        service.upload_document("notes.txt", ("word " * 20_000).encode("utf-8"))
+    assert embedder.batches == 3
+    assert kb_store(service)._count_indexable() == 0
+    assert service.query("word", top_k=5) == []
@@ -0,0 +1,57 @@
+import numpy as np
+
+from app.kb.matrix import VectorMatrix
+
+
+def test_matrix_search_matches_brute_force_across_growth():
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(3000, 16)).astype(np.float32)
+    ids = list(range(100, 100 + len(vectors)))
+    matrix = VectorMatrix()
+    for start in range(0, len(vectors), 700):
+        matrix.append(ids[start : start + 700], vectors[start : start + 700])
+    assert len(matrix) == 3000
+
+    query = rng.normal(size=16).astype(np.float32)
+    scores, top_ids = matrix.search(query, top_k=5)
+
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normed @ (query / np.linalg.norm(query))))[:5]
+    assert list(top_ids) == [ids[i] for i in expected]
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_matrix_search_handles_small_and_mismatched_queries():
+    matrix = VectorMatrix()
+    matrix.append([1, 2], np.eye(2, dtype=np.float32))
+    _, top_ids = matrix.search(np.array([0.0, 1.0], dtype=np.float32), top_k=10)
+    assert list(top_ids) == [2, 1]
+    scores, top_ids = matrix.search(np.ones(3, dtype=np.float32), top_k=1)
+    assert len(scores) == 0 and len(top_ids) == 0
+
+
+def test_batch_search_matches_single_queries():
+    rng = np.random.default_rng(5)
+    matrix = VectorMatrix()
+    matrix.append(list(range(500)), rng.normal(size=(500, 12)).astype(np.float32))
+    queries = rng.normal(size=(7, 12)).astype(np.float32)
+    scores, ids = matrix.search_batch(queries, top_k=4)
+    assert ids.shape == (7, 4)
+    for row, query in enumerate(queries):
+        single_scores, single_ids = matrix.search(query, top_k=4)
+        assert list(ids[row]) == list(single_ids)
+        assert np.allclose(scores[row], single_scores, atol=1e-5)
+
+
+def test_tombstoned_rows_are_skipped_until_compacted():
+    matrix = VectorMatrix()
+    matrix.append([10, 11, 12], np.eye(3, dtype=np.float32))
+    assert matrix.tombstone([11, 99]) == 1
+    _, top_ids = matrix.search(np.array([0.1, 1.0, 0.0], dtype=np.float32), top_k=3)
+    assert list(top_ids) == [10, 12]
+    _, batch_ids = matrix.search_batch(np.array([[0.0, 1.0, 0.0]], dtype=np.float32), top_k=3)
+    assert sorted(batch_ids[0]) == [-1, 10, 12]
+
+    compacted = matrix.compacted()
+    assert len(compacted) == 2 and compacted.dead == 0
+    assert list(compacted.search(np.array([0.0, 1.0, 0.0], dtype=np.float32), top_k=1)[1]) in ([10], [12])
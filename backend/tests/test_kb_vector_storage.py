@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from app.kb import store as store_module
+from app.kb.bench import run_benchmark
+from app.kb.store import KBStore
+
+
+def _fill(store: KBStore, rng: np.random.Generator) -> np.ndarray:
+    vectors = rng.normal(size=(500, 32)).astype(np.float32)
+    store.add_chunks("doc.txt", [f"chunk {i}" for i in range(500)], vectors.tolist())
+    return vectors
+
+
+@pytest.mark.parametrize("backend", ["faiss", "numpy"])
+@pytest.mark.parametrize("storage", ["float16", "int8"])
+def test_quantized_storage_reranks_to_exact_scores(open_kb_store, monkeypatch, backend, storage):
+    if backend == "numpy":
+        monkeypatch.setattr(store_module, "faiss", None)
+    rng = np.random.default_rng(5)
+    store = open_kb_store(kb_vector_storage=storage)
+    vectors = _fill(store, rng)
+    assert store.stats()["vector_storage"] == storage
+
+    queries = rng.normal(size=(5, 32)).astype(np.float32)
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    for query in queries:
+        exact = normed @ (query / np.linalg.norm(query))
+        expected = np.argsort(-exact)[:5]
+        matches = store.search(query.tolist(), top_k=5)
+        assert [m["text"] for m in matches] == [f"chunk {i}" for i in expected]
+        assert [m["score"] for m in matches] == pytest.approx(exact[expected].tolist(), abs=1e-5)
+    _, batch_ids = store.rank_batch(queries.tolist(), top_k=5)
+    assert batch_ids.shape == (5, 5)
+    store.close()
+
+
+def test_snapshot_is_reencoded_when_storage_changes(open_kb_store):
+    store = open_kb_store()
+    _fill(store, np.random.default_rng(1))
+    store.close()
+
+    store = open_kb_store(kb_vector_storage="int8")
+    assert store_module.index_storage(store._index) == "int8"
+    assert store.stats()["index_vectors"] == 500
+    store.close()
+
+
+def test_benchmark_reports_smaller_vectors_with_recall_held():
+    rows = run_benchmark(n_vectors=3000, dim=64, n_queries=50, k=10)
+    by_mode = {(r["backend"], r["storage"]): r for r in rows}
+    for backend in {r["backend"] for r in rows}:
+        full = by_mode[(backend, "float32")]
+        assert full["recall@10"] == 1.0
+        assert by_mode[(backend, "float16")]["bytes_per_vector"] < 0.6 * full["bytes_per_vector"]
+        assert by_mode[(backend, "int8")]["bytes_per_vector"] < 0.4 * full["bytes_per_vector"]
+        assert by_mode[(backend, "int8")]["recall@10_reranked"] >= 0.95
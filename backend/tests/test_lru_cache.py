@@ -0,0 +1,52 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.cache import LRUCache, SingleFlight
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache: LRUCache[int, str] = LRUCache(max_size=2)
+    cache.put(1, "a")
+    cache.put(2, "b")
+    assert cache.get(1) == "a"
+    cache.put(3, "c")
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+
+
+def test_lru_cache_with_zero_size_is_disabled():
+    cache: LRUCache[int, str] = LRUCache(max_size=0)
+    cache.put(1, "a")
+    assert cache.get(1) is None
+
+
+def test_lru_cache_expires_entries_and_counts_hits(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.core.cache.time.monotonic", lambda: now[0])
+    cache: LRUCache[str, int] = LRUCache(max_size=4, ttl_s=10)
+    cache.put("q", 1)
+    assert cache.get("q") == 1
+    now[0] += 11
+    assert cache.get("q") is None
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 1, "hit_ratio": 0.5}
+
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    calls = []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait(timeout=5)
+        return "value"
+
+    flight: SingleFlight[str, str] = SingleFlight()
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        futures = [pool.submit(flight.do, "key", slow) for _ in range(6)]
+        while flight.shared < 5:
+            time.sleep(0.005)
+        release.set()
+        assert [f.result() for f in futures] == ["value"] * 6
+    assert len(calls) == 1
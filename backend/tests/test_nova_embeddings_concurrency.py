@@ -0,0 +1,79 @@
+import io
+import json
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from app.core.config import Settings
+from app.core.ratelimit import TokenBucket
+from app.providers.nova_embeddings import NovaEmbeddingsClient
+
+
+class FakeBedrockRuntime:
+    """Stands in for a `bedrock-runtime` client: fixed latency, optional throttling of the first calls.
+
+    Tracks the peak number of calls in flight. With `gate`, calls hold until that many
+    have overlapped (or a timeout passes), so the peak does not depend on scheduling.
+    """
+
+    def __init__(self, latency_s: float = 0.0, throttle_first: int = 0, gate: int = 0) -> None:
+        self.latency_s = latency_s
+        self.throttle_first = throttle_first
+        self.gate = gate
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._cond = threading.Condition()
+
+    def invoke_model(self, modelId, body, contentType, accept):
+        with self._cond:
+            self.calls += 1
+            throttled = self.calls <= self.throttle_first
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self.peak_in_flight >= self.gate, timeout=2.0)
+        try:
+            time.sleep(self.latency_s)
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+        if throttled:
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "InvokeModel")
+        text = json.loads(body)["inputText"]
+        return {"body": io.BytesIO(json.dumps({"embedding": [float(len(text)), 1.0]}).encode())}
+
+
+def _client(fake, **overrides) -> NovaEmbeddingsClient:
+    settings = Settings(nova_embeddings_rps=0, nova_embeddings_backoff_base_s=0.01, **overrides)
+    return NovaEmbeddingsClient(client=fake, settings=settings)
+
+
+def test_results_keep_input_order_and_throttling_is_retried():
+    fake = FakeBedrockRuntime(throttle_first=5)
+    texts = ["x" * n for n in range(1, 30)]
+    embeddings = _client(fake, nova_embeddings_concurrency=4).embed_texts(texts)
+    assert [e[0] for e in embeddings] == [float(len(t)) for t in texts]
+    assert fake.calls == len(texts) + 5
+
+
+def test_calls_run_concurrently_up_to_the_configured_limit():
+    texts = [f"chunk {i}" for i in range(40)]
+
+    gated = FakeBedrockRuntime(gate=8)
+    _client(gated, nova_embeddings_concurrency=8).embed_texts(texts)
+    assert gated.peak_in_flight == 8
+
+    capped = FakeBedrockRuntime(latency_s=0.005)
+    _client(capped, nova_embeddings_concurrency=3).embed_texts(texts)
+    assert capped.peak_in_flight <= 3
+
+
+def test_token_bucket_caps_request_rate():
+    bucket = TokenBucket(rate=100, burst=5)
+    started = time.perf_counter()
+    for _ in range(25):
+        bucket.acquire()
+    # The first 5 ride the burst; the remaining 20 need ~0.2s at 100/s.
+    assert 0.17 < time.perf_counter() - started < 0.5
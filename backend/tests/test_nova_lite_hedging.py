@@ -0,0 +1,69 @@
+import random
+import threading
+import time
+
+import numpy as np
+
+from app.core.config import Settings
+from app.providers.bedrock_nova_lite import NovaLiteClient
+
+
+class HeavyTailedConverse:
+    """A `bedrock-runtime` stand-in whose latency is Pareto-distributed: mostly fast, occasionally very slow."""
+
+    def __init__(self, seed: int, scale_s: float = 0.005, alpha: float = 1.5, cap_s: float = 0.8) -> None:
+        self._rng = random.Random(seed)
+        self._scale_s = scale_s
+        self._alpha = alpha
+        self._cap_s = cap_s
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def converse(self, modelId, messages, inferenceConfig):
+        with self._lock:
+            self.calls += 1
+            latency_s = min(self._cap_s, self._scale_s * self._rng.paretovariate(self._alpha))
+        time.sleep(latency_s)
+        return {"output": {"message": {"content": [{"text": '{"status": "ok"}'}]}}, "usage": {}}
+
+
+def _client(fake, model_id: str, **overrides) -> NovaLiteClient:
+    # A model id per test: latency windows are shared per model across the process.
+    settings = Settings(bedrock_model_id_nova_lite=model_id, nova_lite_hedge_min_samples=20, **overrides)
+    return NovaLiteClient(client=fake, settings=settings)
+
+
+def _p99_ms(client: NovaLiteClient, calls: int) -> float:
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        client.generate_json("prompt")
+        latencies.append(time.perf_counter() - started)
+    return float(np.percentile(latencies, 99)) * 1000
+
+
+def test_hedging_cuts_the_tail():
+    unhedged = _client(HeavyTailedConverse(seed=7), "hedge-test-off")
+    fake = HeavyTailedConverse(seed=7)
+    hedged = _client(fake, "hedge-test-on", nova_lite_hedge_enabled=True, nova_lite_hedge_percentile=90, nova_lite_hedge_max_rate=0.2)
+    _p99_ms(hedged, 40)  # fills the latency window
+
+    baseline_p99 = _p99_ms(unhedged, 150)
+    hedged_p99 = _p99_ms(hedged, 150)
+
+    assert hedged_p99 < 0.5 * baseline_p99
+    stats = hedged._hedger
+    assert 0 < stats.hedges <= 0.2 * stats.calls + 1
+    assert fake.calls == stats.calls + stats.hedges
+
+
+def test_hedge_rate_is_capped_and_waits_for_enough_samples():
+    fake = HeavyTailedConverse(seed=11)
+    # Hedging at the median would duplicate about half of all calls without the cap.
+    client = _client(fake, "hedge-test-cap", nova_lite_hedge_enabled=True, nova_lite_hedge_percentile=50, nova_lite_hedge_max_rate=0.02)
+
+    _p99_ms(client, 20)
+    assert client._hedger.hedges == 0
+
+    _p99_ms(client, 100)
+    assert 0 < client._hedger.hedges <= 0.02 * client._hedger.calls + 1
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+from app.core.config import Settings
+from app.core.deadline import Deadline, DeadlineExceeded, deadline_scope
+from app.providers.bedrock_nova_lite import NovaLiteClient
+from app.providers.mock_providers import MockLLMProvider
+from app.schemas import SimulateRequest
+from app.sim.service import SimulationService
+
+SIMULATION_JSON = MockLLMProvider().simulate_decision("", [], {}).model_dump_json(by_alias=True)
+
+
+class FakeConverse:
+    """A `bedrock-runtime` stand-in for Nova Lite: optional latency, then a given error for the first calls."""
+
+    def __init__(self, latency_s: float = 0.0, fail_first: int = 0, code: str = "ThrottlingException") -> None:
+        self.latency_s = latency_s
+        self.fail_first = fail_first
+        self.code = code
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def converse(self, modelId, messages, inferenceConfig):
+        with self._lock:
+            self.calls += 1
+            failing = self.calls <= self.fail_first
+        time.sleep(self.latency_s)
+        if failing:
+            raise ClientError({"Error": {"Code": self.code, "Message": "no"}}, "Converse")
+        return {"output": {"message": {"content": [{"text": SIMULATION_JSON}]}}, "usage": {"inputTokens": 5, "outputTokens": 7}}
+
+
+def _llm(fake, **overrides) -> NovaLiteClient:
+    settings = Settings(nova_lite_backoff_base_s=0.01, nova_lite_backoff_max_s=0.01, **overrides)
+    return NovaLiteClient(client=fake, settings=settings)
+
+
+def test_one_policy_owns_every_attempt_and_audit_reports_it(tmp_path, monkeypatch, kb_service):
+    monkeypatch.chdir(tmp_path)
+    fake = FakeConverse(fail_first=2)
+    service = SimulationService(_llm(fake), kb_service())
+
+    result = asyncio.run(service.arun(SimulateRequest(decision_text="Acquire competitor?"), Deadline(5.0)))
+
+    # Decision spec: two throttles and a success; simulation: one call. No hidden botocore retries.
+    assert fake.calls == 4
+    assert result.audit.retry_count == 2
+    assert result.audit.provider_attempts == 4
+    assert result.audit.deadline_ms == 5000
+    assert 0 < result.audit.elapsed_ms < 5000
+    assert result.audit.used_mock is False
+
+
+def test_non_transient_errors_are_not_retried():
+    fake = FakeConverse(fail_first=1, code="AccessDeniedException")
+    with pytest.raises(ClientError):
+        _llm(fake).generate_json("prompt")
+    assert fake.calls == 1
+
+
+def test_retry_is_skipped_when_the_budget_cannot_cover_expected_latency():
+    fake = FakeConverse(latency_s=0.2, fail_first=100)
+    llm = _llm(fake, nova_lite_max_attempts=10)
+    deadline = Deadline(0.5)
+    with deadline_scope(deadline), pytest.raises(DeadlineExceeded):
+        llm.generate_json("prompt")
+    # Attempt 1 ends at ~0.2 s and attempt 2 at ~0.4 s; a third could not finish by 0.5 s.
+    assert fake.calls == 2
+    assert deadline.skipped == 1
+    assert deadline.remaining() > 0
+
+
+def test_async_path_answers_at_the_deadline_even_if_the_call_hangs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake = FakeConverse(latency_s=1.0)
+    llm = _llm(fake)
+
+    async def call() -> float:
+        started = time.perf_counter()
+        with deadline_scope(Deadline(0.2)), pytest.raises(DeadlineExceeded):
+            await llm.agenerate_json("prompt")
+        return time.perf_counter() - started
+
+    assert asyncio.run(call()) < 0.5
+
+
+def test_a_timed_out_call_does_not_block_later_healthy_calls(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fake = FakeConverse(latency_s=1.0)
+    llm = _llm(fake)
+
+    async def call(timeout_s: float) -> Deadline:
+        with deadline_scope(Deadline(timeout_s)) as deadline:
+            await llm.agenerate_json("prompt")
+        return deadline
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(call(0.3))
+
+    # The provider recovers; a tighter budget than the hung call took must still be served.
+    fake.latency_s = 0.0
+    deadline = asyncio.run(call(0.2))
+    assert deadline.attempts == 1
+    assert deadline.skipped == 0